@@ -1,14 +1,36 @@
 import argparse
 import numpy as np
-import json
 import random
 import time
 import os
+from contextlib import nullcontext
 from src.utils.loader import SNDlibLoader
-from src.ea import EvoSolver
+from src.utils.results_io import ResultsWriter
+from src.utils.paths import PATH_WEIGHTS, PathOptions
+from src.runner import run_grid, spawn_seeds
+from src.incidence import PathIncidence
+from src.islands import TOPOLOGIES
+from src.seeding import SEEDING_METHODS
+from src.ea import ADAPTATIONS
+from src.encodings import CROSSOVERS, ENCODINGS
 from src import config
 
 
+def results_path(name):
+    """Path of a JSON Lines file in the results directory"""
+    stem = name[: -len(".json")] if name.endswith(".json") else name
+    if not stem.endswith(".jsonl"):
+        stem += ".jsonl"
+    return os.path.join(config.RESULTS_DIR, stem)
+
+
+def pop_metrics(summary):
+    """Moves RunMetrics out of a run summary (one per island for island runs)"""
+    if "islands" in summary:
+        return [island.pop("metrics", None) for island in summary["islands"]]
+    return summary.pop("metrics", None)
+
+
 def main():
     global_start_time = time.time()
 
@@ -22,11 +44,42 @@ def main():
         default=config.DATA_FILE,
         help="Path to the input network data file.",
     )
+    parser.add_argument(
+        "--k_paths",
+        type=int,
+        default=config.DEFAULT_K_PATHS,
+        help="Number of admissable paths (k shortest ones) generated for demands the input file gives none for.",
+    )
+    parser.add_argument(
+        "--path_weight",
+        type=str,
+        default=config.DEFAULT_PATH_WEIGHT,
+        choices=PATH_WEIGHTS,
+        help="Length measure of generated paths: number of links or euclidean length.",
+    )
+    parser.add_argument(
+        "--max_hops",
+        type=int,
+        default=config.DEFAULT_MAX_HOPS,
+        help="Maximum number of links of generated alternative paths.",
+    )
+    parser.add_argument(
+        "--max_stretch",
+        type=float,
+        default=config.DEFAULT_MAX_STRETCH,
+        help="Maximum length of generated alternative paths relative to the shortest one.",
+    )
+    parser.add_argument(
+        "--disjoint_paths",
+        action="store_true",
+        default=config.DEFAULT_DISJOINT_PATHS,
+        help="Generate link-disjoint paths only.",
+    )
     parser.add_argument(
         "--output_file",
         type=str,
         default=config.DEFAULT_OUTPUT_NAME,
-        help="Filename for the JSON results file.",
+        help="Filename for the JSON Lines results file, written as every configuration finishes (best chromosomes are saved next to it as .npy files).",
     )
     parser.add_argument(
         "--repeats",
@@ -49,8 +102,22 @@ def main():
     parser.add_argument(
         "--mutation_rate",
         type=float,
-        default=config.DEFAULT_MUTATION_RATE,
-        help="Probability of mutation for each gene.",
+        default=None,
+        help=f"Probability of mutation for each gene (default: {config.DEFAULT_MUTATION_RATE} for weights, {config.DEFAULT_INDEX_MUTATION_RATE} for the index encoding).",
+    )
+    parser.add_argument(
+        "--encoding",
+        type=str,
+        default=config.DEFAULT_ENCODING,
+        choices=ENCODINGS,
+        help="Chromosome encoding: path weights, or one path index per demand (aggregation only, deaggregation keeps weights).",
+    )
+    parser.add_argument(
+        "--crossover",
+        type=str,
+        default=config.DEFAULT_CROSSOVER,
+        choices=CROSSOVERS,
+        help="Crossover of the index encoding (weights always use arithmetic crossover).",
     )
     parser.add_argument(
         "--alpha",
@@ -100,7 +167,7 @@ def main():
         "--seed",
         type=int,
         default=None,
-        help="Starting seed for random number generation (it will increment by 1 every simulation repetition).",
+        help="Base seed of the whole grid, every repetition of every configuration gets its own random stream spawned from it.",
     )
     parser.add_argument(
         "--sigma",
@@ -108,6 +175,187 @@ def main():
         default=config.DEFAULT_SIGMA,
         help="Initial standard deviation for Gaussian mutation.",
     )
+    parser.add_argument(
+        "--adaptation",
+        type=str,
+        default=config.DEFAULT_ADAPTATION,
+        choices=ADAPTATIONS,
+        help="Mutation step size control: fixed sigma, 1/5th success rule or per-individual self-adaptive sigma and mutation rate.",
+    )
+    parser.add_argument(
+        "--restart_after",
+        type=int,
+        default=config.DEFAULT_RESTART_AFTER,
+        help="Re-initialize the population (keeping the best individual) after this many generations without improvement (disabled if not given).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=config.DEFAULT_INCREMENTAL,
+        help="Evaluate offspring incrementally, re-routing only demands changed since their parent.",
+    )
+    parser.add_argument(
+        "--cache_size",
+        type=int,
+        default=config.DEFAULT_CACHE_SIZE,
+        help="Size of the LRU cache of aggregation routing costs (0 disables it).",
+    )
+    parser.add_argument(
+        "--eval_workers",
+        type=int,
+        default=config.DEFAULT_EVAL_WORKERS,
+        help="Processes evaluating each population in place from shared memory (1 evaluates in the solver's process, not compatible with --incremental).",
+    )
+    parser.add_argument(
+        "--seeding",
+        nargs="+",
+        choices=SEEDING_METHODS,
+        default=config.DEFAULT_SEEDING,
+        help="Constructive heuristics seeding part of the initial population (capacity-aware greedy, randomised GRASP, load-balanced).",
+    )
+    parser.add_argument(
+        "--seeding_ratio",
+        type=float,
+        default=config.DEFAULT_SEEDING_RATIO,
+        help="Fraction of the initial population built by --seeding methods.",
+    )
+    parser.add_argument(
+        "--grasp_alpha",
+        type=float,
+        default=config.DEFAULT_GRASP_ALPHA,
+        help="Width of the GRASP restricted candidate list (0 = pure greedy, 1 = any path).",
+    )
+    parser.add_argument(
+        "--local_search_every",
+        type=int,
+        default=config.DEFAULT_LOCAL_SEARCH_EVERY,
+        help="Run local search on the best individuals every this many generations (disabled if not given).",
+    )
+    parser.add_argument(
+        "--local_search_elites",
+        type=int,
+        default=config.DEFAULT_LOCAL_SEARCH_ELITES,
+        help="Number of best individuals refined by every local search.",
+    )
+    parser.add_argument(
+        "--local_search_passes",
+        type=int,
+        default=config.DEFAULT_LOCAL_SEARCH_PASSES,
+        help="Maximum number of passes over all demands of a single local search.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        choices=["lp", "milp"],
+        help="Seed deaggregation runs with an LP relaxation (rounded) or exact MILP solution (needs scipy); its lower bound stops runs unless --target_cost is given.",
+    )
+    parser.add_argument(
+        "--baseline_time_limit",
+        type=float,
+        default=config.DEFAULT_BASELINE_TIME_LIMIT,
+        help="Time limit of a single baseline solve in seconds.",
+    )
+    parser.add_argument(
+        "--stagnation_limit",
+        type=int,
+        default=config.DEFAULT_STAGNATION_LIMIT,
+        help="Stop a run after this many generations without improvement.",
+    )
+    parser.add_argument(
+        "--target_cost",
+        type=float,
+        default=config.DEFAULT_TARGET_COST,
+        help="Stop a run once its best cost is at most this value.",
+    )
+    parser.add_argument(
+        "--time_limit",
+        type=float,
+        default=config.DEFAULT_TIME_LIMIT,
+        help="Wall-clock budget of a single run in seconds.",
+    )
+    parser.add_argument(
+        "--max_evaluations",
+        type=int,
+        default=config.DEFAULT_MAX_EVALUATIONS,
+        help="Fitness evaluation budget of a single run.",
+    )
+    parser.add_argument(
+        "--islands",
+        type=int,
+        default=config.DEFAULT_ISLANDS,
+        help="Number of island populations (processes) per run, each of --pop individuals.",
+    )
+    parser.add_argument(
+        "--topology",
+        type=str,
+        default=config.DEFAULT_TOPOLOGY,
+        choices=TOPOLOGIES,
+        help="Migration topology between islands.",
+    )
+    parser.add_argument(
+        "--migration_interval",
+        type=int,
+        default=config.DEFAULT_MIGRATION_INTERVAL,
+        help="Number of generations between migrations.",
+    )
+    parser.add_argument(
+        "--migration_size",
+        type=int,
+        default=config.DEFAULT_MIGRATION_SIZE,
+        help="Number of best individuals every island sends on migration.",
+    )
+    parser.add_argument(
+        "--island_sigmas",
+        nargs="+",
+        type=float,
+        default=None,
+        help="Per-island sigma values (used cyclically), instead of --sigma.",
+    )
+    parser.add_argument(
+        "--island_alphas",
+        nargs="+",
+        type=float,
+        default=None,
+        help="Per-island crossover alpha values (used cyclically), instead of --alpha.",
+    )
+    parser.add_argument(
+        "--island_mutation_rates",
+        nargs="+",
+        type=float,
+        default=None,
+        help="Per-island mutation rates (used cyclically), instead of --mutation_rate.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.DEFAULT_WORKERS,
+        help="Number of processes running simulations in parallel.",
+    )
+    parser.add_argument(
+        "--checkpoint_dir",
+        type=str,
+        default=None,
+        help="Directory for checkpoints of every run (one file per run), disabled if not given. Not supported with --islands.",
+    )
+    parser.add_argument(
+        "--checkpoint_every",
+        type=int,
+        default=config.DEFAULT_CHECKPOINT_EVERY,
+        help="Number of generations between checkpoints (each run is also saved when it ends).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Continue runs from their checkpoints in --checkpoint_dir (same --seed needed), finished runs are not repeated.",
+    )
+    parser.add_argument(
+        "--metrics_file",
+        type=str,
+        default=None,
+        help="Filename for per-generation instrumentation of every run (phase timings, evaluations, cache hit rate, diversity), disabled if not given.",
+    )
     args = parser.parse_args()
 
     try:
@@ -115,7 +363,15 @@ def main():
         if args.seed is None:
             base_seed = random.randint(0, 20041202)
 
-        network = SNDlibLoader.load(args.input_file)
+        path_options = PathOptions(
+            k=args.k_paths,
+            weight=args.path_weight,
+            max_hops=args.max_hops,
+            max_stretch=args.max_stretch,
+            disjoint=args.disjoint_paths,
+        )
+        network = SNDlibLoader.load_compiled(args.input_file, path_options=path_options)
+        incidence = PathIncidence(network)
         modularities = args.modularities
 
         if args.mode == "agg":
@@ -126,95 +382,168 @@ def main():
             modes = [True, False]
 
         print(
-            f"\nREPEATS: {args.repeats}, POPULATION SIZE: {args.pop}, GENERATION COUNT: {args.gens}, MUTATION RATE: {args.mutation_rate}, SIGMA: {args.sigma},"
+            f"\nREPEATS: {args.repeats}, POPULATION SIZE: {args.pop}, GENERATION COUNT: {args.gens}, MUTATION RATE: {args.mutation_rate or 'default'}, ENCODING: {args.encoding}, SIGMA: {args.sigma}, WORKERS: {args.workers},"
         )
         print(
-            f"HEURISTIC RATIO: {args.heuristic_ratio}, MODE: {args.mode}, HEURISTIC: {not args.no_heuristic}, ELITISM: {not args.no_elitism}, TOURNAMENT SIZE: {args.tournament_size}"
+            f"HEURISTIC RATIO: {args.heuristic_ratio}, MODE: {args.mode}, HEURISTIC: {not args.no_heuristic}, ELITISM: {not args.no_elitism}, TOURNAMENT SIZE: {args.tournament_size}, ISLANDS: {args.islands}"
         )
         print(f"STARTING SEED: {base_seed}")
         print("\n" + "=" * 130)
         print(
             f"{'Mode':<15} | {'Modularity':<15} | {'Best':<12} | {'Mean':<12} | {'Std Dev':<10} | {'Convergence Gen':<20} | {'Avg Time':<10}"
         )
-        results_data = []
-
-        for agg in modes:
-            print("-" * 130)
-            mode_label = "Aggregation" if agg else "Deaggregation"
-            for m in modularities:
-                seed = base_seed
-                costs = []
-                gens = []
-                histories = []
-                times = []
-
-                best_chromosome_overall = None
-                best_cost_overall = float("inf")
-
-                for _ in range(args.repeats):
-                    np.random.seed(seed)
-                    random.seed(seed)
-                    seed += 1
-
-                    solver = EvoSolver(
-                        network,
-                        modularity=m,
-                        aggregation=agg,
-                        pop_size=args.pop,
-                        generations=args.gens,
-                        mutation_rate=args.mutation_rate,
-                        alpha=args.alpha,
-                        sigma=args.sigma,
-                        use_heuristic=not args.no_heuristic,
-                        heuristic_ratio=args.heuristic_ratio,
-                        elitism=not args.no_elitism,
-                        tournament_size=args.tournament_size,
-                    )
-
-                    start_time = time.time()
-                    best_chrom, best, conv, history = solver.run()
-                    end_time = time.time()
-
-                    if best < best_cost_overall:
-                        best_cost_overall = best
-                        best_chromosome_overall = best_chrom
-
-                    costs.append(best)
-                    gens.append(conv)
-                    histories.append(history)
-                    times.append(end_time - start_time)
-
-                results_data.append(
-                    {
-                        "mode": mode_label,
-                        "modularity": m,
-                        "best_cost": float(np.min(costs)),
-                        "mean_cost": float(np.mean(costs)),
-                        "std_cost": float(np.std(costs)),
-                        "avg_convergence": float(np.mean(gens)),
-                        "avg_time": float(np.mean(times)),
-                        "histories": histories[0],
-                        "best_chromosome": best_chromosome_overall.tolist()
-                        if best_chromosome_overall is not None
-                        else [],
-                    }
-                )
-
-                print(
-                    f"{mode_label:<15} | {m:<15} | {np.min(costs):<12} | {np.mean(costs):<12.2f} | "
-                    f"{np.std(costs):<10.2f} | {np.mean(gens):<20.1f} | {np.mean(times):.2f}s ({np.sum(times):.2f}s total)"
-                )
 
-        print("=" * 130)
+        solver_kwargs = dict(
+            pop_size=args.pop,
+            generations=args.gens,
+            mutation_rate=args.mutation_rate,
+            encoding=args.encoding,
+            crossover_type=args.crossover,
+            alpha=args.alpha,
+            sigma=args.sigma,
+            use_heuristic=not args.no_heuristic,
+            heuristic_ratio=args.heuristic_ratio,
+            elitism=not args.no_elitism,
+            tournament_size=args.tournament_size,
+            adaptation=args.adaptation,
+            restart_after=args.restart_after,
+            incremental=args.incremental,
+            cache_size=args.cache_size,
+            eval_workers=args.eval_workers,
+            seeding=args.seeding,
+            seeding_ratio=args.seeding_ratio,
+            grasp_alpha=args.grasp_alpha,
+            local_search_every=args.local_search_every,
+            local_search_elites=args.local_search_elites,
+            local_search_passes=args.local_search_passes,
+            stagnation_limit=args.stagnation_limit,
+            target_cost=args.target_cost,
+            time_limit=args.time_limit,
+            max_evaluations=args.max_evaluations,
+        )
+        island_overrides = {
+            "sigma": args.island_sigmas,
+            "alpha": args.island_alphas,
+            "mutation_rate": args.island_mutation_rates,
+        }
+        island_params = [
+            {
+                key: values[i % len(values)]
+                for key, values in island_overrides.items()
+                if values
+            }
+            for i in range(args.islands)
+        ]
+        island_kwargs = dict(
+            num_islands=args.islands,
+            topology=args.topology,
+            migration_interval=args.migration_interval,
+            migration_size=args.migration_size,
+            island_params=island_params,
+        )
+        checkpoint_kwargs = None
+        if args.checkpoint_dir:
+            checkpoint_kwargs = dict(
+                directory=args.checkpoint_dir,
+                every=args.checkpoint_every,
+                resume=args.resume,
+            )
+        elif args.resume:
+            raise ValueError("--resume needs --checkpoint_dir")
+        cells = [(agg, m) for agg in modes for m in modularities]
+        seeds = spawn_seeds(base_seed, len(cells), args.repeats)
+        tasks = [
+            (agg, m, seed)
+            for (agg, m), cell_seeds in zip(cells, seeds)
+            for seed in cell_seeds
+        ]
+        runs = run_grid(
+            network,
+            tasks,
+            solver_kwargs,
+            workers=args.workers,
+            island_kwargs=island_kwargs,
+            collect_metrics=args.metrics_file is not None,
+            checkpoint_kwargs=checkpoint_kwargs,
+            baseline_kwargs=(
+                dict(method=args.baseline, time_limit=args.baseline_time_limit)
+                if args.baseline
+                else None
+            ),
+        )
 
         os.makedirs(config.RESULTS_DIR, exist_ok=True)
-        final_path = os.path.join(config.RESULTS_DIR, args.output_file)
-        if not final_path.endswith(".json"):
-            final_path += ".json"
+        final_path = results_path(args.output_file)
+        metrics_path = results_path(args.metrics_file) if args.metrics_file else None
+
+        with ResultsWriter(final_path) as results_out, (
+            ResultsWriter(metrics_path) if metrics_path else nullcontext()
+        ) as metrics_out:
+            for agg in modes:
+                print("-" * 130)
+                mode_label = "Aggregation" if agg else "Deaggregation"
+                for m in modularities:
+                    costs = []
+                    gens = []
+                    histories = []
+                    times = []
+                    run_summaries = []
+                    run_metrics = []
+
+                    best_chromosome_overall = None
+                    best_cost_overall = float("inf")
 
-        with open(final_path, "w") as fh:
-            json.dump(results_data, fh, indent=4)
+                    for _ in range(args.repeats):
+                        best_chrom, best, conv, history, run_time, run_summary = next(
+                            runs
+                        )
+
+                        if best < best_cost_overall:
+                            best_cost_overall = best
+                            best_chromosome_overall = best_chrom
+
+                        costs.append(best)
+                        gens.append(conv)
+                        histories.append(history)
+                        times.append(run_time)
+                        run_summaries.append(run_summary)
+                        run_metrics.append(pop_metrics(run_summary))
+
+                    # every finished cell goes straight to disk
+                    results_out.write(
+                        {
+                            "mode": mode_label,
+                            "modularity": m,
+                            "best_cost": float(np.min(costs)),
+                            "mean_cost": float(np.mean(costs)),
+                            "std_cost": float(np.std(costs)),
+                            "avg_convergence": float(np.mean(gens)),
+                            "avg_time": float(np.mean(times)),
+                            "histories": histories[0],
+                            "runs": run_summaries,
+                        },
+                        # result files keep the padded (demands x paths) layout
+                        chromosome=(
+                            incidence.to_matrix(best_chromosome_overall)
+                            if best_chromosome_overall is not None
+                            else None
+                        ),
+                        name=f"{'agg' if agg else 'deagg'}_m{m:g}",
+                    )
+                    if metrics_out is not None:
+                        metrics_out.write(
+                            {"mode": mode_label, "modularity": m, "runs": run_metrics}
+                        )
+
+                    print(
+                        f"{mode_label:<15} | {m:<15} | {np.min(costs):<12} | {np.mean(costs):<12.2f} | "
+                        f"{np.std(costs):<10.2f} | {np.mean(gens):<20.1f} | {np.mean(times):.2f}s ({np.sum(times):.2f}s total)"
+                    )
+
+        print("=" * 130)
         print(f"Results saved to {final_path}")
+        if metrics_path:
+            print(f"Metrics saved to {metrics_path}")
 
         global_end_time = time.time()
         print(
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+def save_checkpoint(file_path, arrays):
+    """
+    Writes arrays as one uncompressed .npz file.
+
+    The file is written next to its destination and renamed over it, so a run killed
+    mid-write always leaves the previous checkpoint intact.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_checkpoint(file_path):
+    with np.load(file_path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def capture_rng_state(rng):
+    """State of a Generator's bit generator as a JSON string"""
+    return json.dumps(rng.bit_generator.state)
+
+
+def restore_rng_state(rng, encoded):
+    rng.bit_generator.state = json.loads(str(encoded))
+
+
+def capture_settings(settings):
+    """Solver settings as a JSON string, stored to check resumed runs against"""
+    return json.dumps(settings, sort_keys=True)
+
+
+def changed_settings(encoded, settings):
+    """Names of settings that differ from the stored ones"""
+    saved = json.loads(str(encoded))
+    current = json.loads(capture_settings(settings))
+    return sorted(
+        name
+        for name in saved.keys() | current.keys()
+        if saved.get(name) != current.get(name)
+    )
@@ -4,7 +4,14 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_FILE = os.path.join(BASE_DIR, "data", "polska.txt")
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
-DEFAULT_OUTPUT_NAME = "results.json"
+DEFAULT_OUTPUT_NAME = "results.jsonl"
+
+# PATH GENERATION (SNDlib files without ADMISSIBLE_PATHS)
+DEFAULT_K_PATHS = 5
+DEFAULT_PATH_WEIGHT = "hops"  # "hops" or "length"
+DEFAULT_MAX_HOPS = None
+DEFAULT_MAX_STRETCH = None  # bound on path weight relative to the shortest path
+DEFAULT_DISJOINT_PATHS = False
 
 # EA PARAMETERS
 DEFAULT_POP_SIZE = 300
@@ -17,7 +24,50 @@ DEFAULT_ELITISM = True
 DEFAULT_SIGMA = 0.2
 DEFAULT_HEURISTIC_RATIO = 0.0
 DEFAULT_TOURNAMENT_SIZE = 8
+DEFAULT_INCREMENTAL = False
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_EVAL_WORKERS = 1  # above 1: shared-memory evaluation pool per run
+DEFAULT_ENCODING = "weights"  # "weights" or "index" (aggregation only)
+DEFAULT_INDEX_MUTATION_RATE = 0.02  # per demand, index encoding
+DEFAULT_CROSSOVER = "uniform"  # "uniform" or "one_point", index encoding
+DEFAULT_ADAPTATION = "fixed"  # "fixed", "one_fifth" or "self_adaptive"
+DEFAULT_RESTART_AFTER = None  # generations without improvement before a restart
+
+# CONSTRUCTIVE SEEDING (methods from seeding.SEEDING_METHODS, empty = disabled)
+DEFAULT_SEEDING = []
+DEFAULT_SEEDING_RATIO = 0.1
+DEFAULT_GRASP_ALPHA = 0.3
+
+# MEMETIC LOCAL SEARCH (every = None disables it)
+DEFAULT_LOCAL_SEARCH_EVERY = None
+DEFAULT_LOCAL_SEARCH_ELITES = 1
+DEFAULT_LOCAL_SEARCH_PASSES = 1
+
+# DEAGGREGATION BASELINE (HiGHS through scipy)
+DEFAULT_BASELINE_TIME_LIMIT = 60.0
+
+# TERMINATION CRITERIA (None = disabled, the run ends after all generations)
+DEFAULT_STAGNATION_LIMIT = None
+DEFAULT_TARGET_COST = None
+DEFAULT_TIME_LIMIT = None
+DEFAULT_MAX_EVALUATIONS = None
+
+# ISLAND MODEL
+DEFAULT_ISLANDS = 1
+DEFAULT_TOPOLOGY = "ring"
+DEFAULT_MIGRATION_INTERVAL = 10
+DEFAULT_MIGRATION_SIZE = 2
 
 # META PARAMETERS
 DEFAULT_REPEATS = 10
-DEFAULT_MODULARITY = 10  # used for map's visualization only
+DEFAULT_WORKERS = 1
+DEFAULT_CHECKPOINT_EVERY = 10
+DEFAULT_MODULARITY = 10  # used for map's visualization and service jobs only
+
+# OPTIMIZATION SERVICE (src/service.py)
+DEFAULT_SERVICE_HOST = "127.0.0.1"
+DEFAULT_SERVICE_PORT = 8765
+DEFAULT_SERVICE_WORKERS = 1
+DEFAULT_SERVICE_MAX_QUEUED = 100
+DEFAULT_SERVICE_PROGRESS_EVERY = 1
+DEFAULT_SERVICE_KEEP_FINISHED = 100
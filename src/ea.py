@@ -1,15 +1,43 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
 import numpy as np
-import random
-import math
-from copy import deepcopy
-from .models import Network
+from .models import CompiledNetwork, Network
+from .incidence import PathIncidence
+from .metrics import RunMetrics, untimed
+from .local_search import LocalSearch
+from .seeding import seed_population
+from .parallel import SharedEvaluator
+from .checkpoint import (
+    capture_rng_state,
+    capture_settings,
+    changed_settings,
+    load_checkpoint,
+    restore_rng_state,
+    save_checkpoint,
+)
 from src import config
 
+# incremental evaluation falls back to a full one above this fraction of changed genes
+DELTA_MAX_CHANGED_FRACTION = 0.3
+# and is refreshed by a full evaluation at least this often, to stop float drift
+DELTA_REFRESH_INTERVAL = 20
+# bytes of a hashed routing in the aggregation cache
+CACHE_KEY_SIZE = 16
+# step size control of the gaussian mutation
+ADAPTATIONS = ["fixed", "one_fifth", "self_adaptive"]
+SIGMA_BOUNDS = (0.0005, 1.0)
+MUTATION_RATE_BOUNDS = (0.001, 1.0)
+# one_fifth: sigma is divided (success rate above 1/5) or multiplied by this factor
+ONE_FIFTH_FACTOR = 0.85
+
 
 class EvoSolver:
     def __init__(
         self,
-        network: Network,
+        network: Network | CompiledNetwork,
         modularity: float = config.DEFAULT_MODULARITIES[0],
         aggregation: bool = True,
         pop_size: int = config.DEFAULT_POP_SIZE,
@@ -21,6 +49,24 @@ class EvoSolver:
         heuristic_ratio: float = config.DEFAULT_HEURISTIC_RATIO,
         elitism: bool = config.DEFAULT_ELITISM,
         tournament_size: int = config.DEFAULT_TOURNAMENT_SIZE,
+        rng=None,
+        incremental: bool = config.DEFAULT_INCREMENTAL,
+        cache_size: int = config.DEFAULT_CACHE_SIZE,
+        stagnation_limit: int = config.DEFAULT_STAGNATION_LIMIT,
+        target_cost: float = config.DEFAULT_TARGET_COST,
+        time_limit: float = config.DEFAULT_TIME_LIMIT,
+        max_evaluations: int = config.DEFAULT_MAX_EVALUATIONS,
+        metrics: RunMetrics = None,
+        local_search_every: int = config.DEFAULT_LOCAL_SEARCH_EVERY,
+        local_search_elites: int = config.DEFAULT_LOCAL_SEARCH_ELITES,
+        local_search_passes: int = config.DEFAULT_LOCAL_SEARCH_PASSES,
+        initial_individuals=None,
+        seeding=config.DEFAULT_SEEDING,
+        seeding_ratio: float = config.DEFAULT_SEEDING_RATIO,
+        grasp_alpha: float = config.DEFAULT_GRASP_ALPHA,
+        adaptation: str = config.DEFAULT_ADAPTATION,
+        restart_after: int = config.DEFAULT_RESTART_AFTER,
+        eval_workers: int = config.DEFAULT_EVAL_WORKERS,
     ):
         self.network = network
         self.modularity = modularity
@@ -30,177 +76,838 @@ class EvoSolver:
         self.mutation_rate = mutation_rate
         self.alpha = alpha
         self.population = []
-        self.demand_ids = list(network.demands.keys())
+        self.incidence = PathIncidence(network)
+        self.demand_ids = self.incidence.demand_ids
         self.use_heuristic = use_heuristic
         self.elitism = elitism
         self.base_sigma = sigma
         self.heuristic_ratio = heuristic_ratio
         self.tournament_size = tournament_size
-
-    def get_link_loads(self, individual):
+        if adaptation not in ADAPTATIONS:
+            raise ValueError(f"Unknown adaptation: {adaptation}")
+        # fixed: base_sigma throughout, one_fifth: Rechenberg's 1/5 success rule,
+        # self_adaptive: every individual carries its own sigma and mutation rate
+        self.adaptation = adaptation
+        self.sigmas = None
+        self.rates = None
+        self._tau = 1.0 / np.sqrt(max(self.incidence.num_genes, 1))
+        self._parent_scores = None
+        self.sigma_history = []
+        self.rate_history = []
+        # stagnation-triggered restarts: all but the best individual are re-initialized
+        self.restart_after = restart_after
+        self.restarts = 0
+        # (k x num_genes) individuals placed in the initial population
+        self.initial_individuals = initial_individuals
+        # constructive heuristics (see seeding.py) filling seeding_ratio of the rest
+        self.seeding = list(seeding or [])
+        self.seeding_ratio = seeding_ratio
+        self.grasp_alpha = grasp_alpha
+        # seed, SeedSequence or Generator - the only source of randomness of the solver
+        self.rng = np.random.default_rng(rng)
+        if incremental and eval_workers > 1:
+            raise ValueError("Incremental evaluation can't use evaluation workers")
+        self.incremental = incremental
+        # routing, link loads and costs of the last evaluated population (incremental mode)
+        self._routing = None
+        self._loads = None
+        self._costs = None
+        self._known = None
+        self._delta_streak = 0
+        # aggregation only: LRU cache of costs keyed on hashed routing decisions
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.evaluations = 0
+        # above 1: populations live in shared memory and are evaluated by a pool of
+        # this many processes (see parallel.py), started for the duration of run()
+        self.eval_workers = eval_workers
+        self._evaluator = None
+        # termination criteria besides the generation count, None disables each of them
+        self.stagnation_limit = stagnation_limit
+        self.target_cost = target_cost
+        self.time_limit = time_limit
+        self.max_evaluations = max_evaluations
+        self.termination_reason = None
+        self.generations_run = 0
+        # memetic stage: local search on the best individuals every few generations
+        self.local_search_every = local_search_every
+        self.local_search_elites = local_search_elites
+        self.local_search_passes = local_search_passes
+        self._local_search = LocalSearch(self.incidence, aggregation, modularity)
+        # optional instrumentation, phases are not timed at all without it
+        self.metrics = metrics
+        self._phase = metrics.phase if metrics is not None else untimed
+        # content hash of the network, computed on the first checkpoint
+        self._network_digest = None
+
+    def get_load_vector(self, individual):
         """
-        Calculates total traffic load for each link in the network.
+        Calculates total traffic load for each link as a vector ordered like incidence.link_ids.
 
         Implements two scenarios:
         - aggregation: traffic follows the path with the highest weight (not splitted).
         - deaggregation: traffic distributed proportionally among all paths (splitted).
         """
-        link_loads = {lid: 0.0 for lid in self.network.links}
+        flows = self.incidence.routing_flows(self.decode(individual), self.aggregation)
+        return self.incidence.link_loads(flows)
 
-        for i, d_id in enumerate(self.demand_ids):
-            demand = self.network.demands[d_id]
-            paths = demand.admissable_paths
-            num_paths = len(paths)
+    def decode(self, population):
+        """Routing (see PathIncidence.routing) of a population or a single individual"""
+        return self.incidence.routing(population, self.aggregation)
 
-            if num_paths == 0:
-                continue
+    def encode(self, weights):
+        """Individuals of this solver's encoding from (..., num_genes) path weights"""
+        return np.asarray(weights, dtype=np.float64)
 
-            # connecting weights to admissable paths
-            weights = individual[i, :num_paths]
+    def to_weights(self, individual):
+        """Path weights of an individual, inverse of encode"""
+        return individual
 
-            # Aggregation - Winner takes all
-            if self.aggregation:
-                chosen_idx = np.argmax(weights)
-                chosen_path = paths[chosen_idx]
-                for link_id in chosen_path:
-                    link_loads[link_id] += demand.value
+    def batch_cost(self, population):
+        return self.incidence.batch_cost(population, self.aggregation, self.modularity)
 
-            # Deaggregation - Flow proportional to weights
-            else:
-                total_weight = np.sum(weights)
+    def get_link_loads(self, individual):
+        """Calculates total traffic load for each link in the network, keyed by link id."""
+        loads = self.get_load_vector(individual)
+        return dict(zip(self.incidence.link_ids, loads.tolist()))
 
-                if total_weight > 0:
-                    ratios = weights / total_weight
-                else:
-                    ratios = np.ones(num_paths) / num_paths
+    def calculate_cost(self, individual):
+        loads = self.get_load_vector(individual)
+        return int(self.incidence.modular_cost(loads, self.modularity))
 
-                for idx, ratio in enumerate(ratios):
-                    flow = demand.value * ratio
-                    path = paths[idx]
-                    for link_id in path:
-                        link_loads[link_id] += flow
+    def evaluate_population(self, population, parents=None):
+        """
+        Cost vector for the whole population in a single batched call.
 
-        return link_loads
+        Aggregation routings evaluated before are answered from the LRU cache.
+        In incremental mode `parents` maps every row to the row of the previously
+        evaluated population it was derived from; the link loads of that parent are
+        then updated only with demands whose routing changed.
+        """
+        use_cache = self.aggregation and self.cache_size > 0
+        if not (use_cache or self.incremental):
+            self.evaluations += len(population)
+            if self._evaluator is not None:
+                return self._evaluator.evaluate(population)
+            return self.batch_cost(population)
+
+        routing = self.decode(population)
+        costs = np.zeros(len(population), dtype=np.int64)
+        pending = np.arange(len(population))
+
+        if use_cache:
+            keys = self._cache_keys(routing)
+            pending = self._cache_lookup(keys, costs)
+        evaluated = pending
+        self.evaluations += len(pending)
+
+        loads = None
+        if self.incremental:
+            loads = np.zeros((len(population), self.incidence.num_links))
+            known = np.zeros(len(population), dtype=bool)
+            if (
+                parents is not None
+                and self._loads is not None
+                and self._delta_streak < DELTA_REFRESH_INTERVAL
+            ):
+                done = self._delta_evaluation(routing, parents, pending, costs, loads)
+                known[done] = True
+                pending = pending[~known[pending]]
+                self._delta_streak = self._delta_streak + 1 if len(done) else 0
+            else:
+                self._delta_streak = 0
+
+        if len(pending) and self._evaluator is not None:
+            costs[pending] = self._evaluator.evaluate(population, pending)
+        elif len(pending):
+            pending_loads = self.incidence.routing_loads(
+                routing[pending], self.aggregation
+            )
+            costs[pending] = self.incidence.modular_cost(pending_loads, self.modularity)
+            if self.incremental:
+                loads[pending] = pending_loads
+                known[pending] = True
+
+        if use_cache:
+            self._cache_store([keys[i] for i in evaluated], costs[evaluated])
+        if self.incremental:
+            # rows answered by the cache have no loads to start deltas from
+            self._routing, self._loads, self._costs = routing, loads, costs
+            self._known = known
+        return costs
+
+    def _delta_evaluation(self, routing, parents, rows, costs, loads):
+        """
+        Fills costs and loads of `rows` from their parents' loads.
 
-    def calculate_cost(self, individual):
-        loads = self.get_link_loads(individual)
-        total_cost = 0
-        for load in loads.values():
-            total_cost += math.ceil(round(load, 6) / self.modularity)
-        return total_cost
+        Returns the rows it evaluated - none if too much changed since the parents.
+        """
+        rows = rows[self._known[parents[rows]]]
+        parent_rows = parents[rows]
+        child_routing = routing[rows]
+        parent_routing = self._routing[parent_rows]
+        changed = child_routing != parent_routing
+        if not self.aggregation:
+            changed &= ~np.isclose(child_routing, parent_routing, rtol=0.0, atol=1e-12)
+        if np.count_nonzero(changed) > DELTA_MAX_CHANGED_FRACTION * changed.size:
+            return rows[:0]
+
+        local, cols = np.nonzero(changed)
+        if self.aggregation:
+            # demand value moves from the parent's path to the child's one
+            values = self.incidence.values[self.incidence.routed[cols]]
+            paths = np.concatenate(
+                [parent_routing[local, cols], child_routing[local, cols]]
+            )
+            deltas = np.concatenate([-values, values])
+            local = np.concatenate([local, local])
+        else:
+            paths = cols
+            deltas = child_routing[local, cols] - parent_routing[local, cols]
+
+        child_loads = self._loads[parent_rows]
+        touched, links, changes = self.incidence.link_deltas(local, paths, deltas)
+        old = child_loads[touched, links]
+        new = old + changes
+        child_loads[touched, links] = new
+
+        # modular cost changes only on touched links
+        cost_changes = self.incidence.modules(
+            new, self.modularity
+        ) - self.incidence.modules(old, self.modularity)
+        costs[rows] = self._costs[parent_rows] + np.bincount(
+            touched, weights=cost_changes, minlength=len(rows)
+        ).astype(np.int64)
+        loads[rows] = child_loads
+        return rows
+
+    def _cache_keys(self, routing):
+        """Compact hash of every chosen-path vector (one per population row)."""
+        chosen = routing - self.incidence.path_offsets[self.incidence.routed]
+        chosen = chosen.astype(
+            np.uint8 if self.incidence.max_paths <= 256 else np.uint16
+        )
+        return [
+            hashlib.blake2b(row.tobytes(), digest_size=CACHE_KEY_SIZE).digest()
+            for row in chosen
+        ]
+
+    def _cache_lookup(self, keys, costs):
+        """Fills costs of cached routings, returns rows that still need evaluation."""
+        misses = []
+        for i, key in enumerate(keys):
+            cost = self._cache.get(key)
+            if cost is None:
+                misses.append(i)
+            else:
+                self._cache.move_to_end(key)
+                costs[i] = cost
+        self.cache_misses += len(misses)
+        self.cache_hits += len(keys) - len(misses)
+        return np.array(misses, dtype=np.int64)
+
+    def _cache_store(self, keys, costs):
+        for key, cost in zip(keys, costs.tolist()):
+            self._cache[key] = cost
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
 
     def initialize_population(self):
-        """Initialize population with 1 deterministic individual and the rest generated randomly"""
-        self.population = []
-
-        num_demands = len(self.demand_ids)
-        max_paths = max(
-            len(self.network.demands[demand_id].admissable_paths)
-            for demand_id in self.demand_ids
-        )
+        """Initialize population with 1 deterministic individual, given seeds, constructed ones and the rest generated randomly"""
+        self.population = self.empty_population(self.pop_size)
+        # reproduction buffers, swapped with population instead of reallocated
+        self._offspring = self.empty_population(self.pop_size, "offspring")
+        self._scratch = np.empty_like(self.population)
 
-        remaining_slots = self.pop_size
+        filled = 0
         # deterministic - 1 individual
         if self.use_heuristic:
-            deterministic_individual = np.zeros((num_demands, max_paths))
-            for i, demand_id in enumerate(self.demand_ids):
-                paths = self.network.demands[demand_id].admissable_paths
-                shortest_path_idx = np.argmin([len(p) for p in paths])
-                deterministic_individual[i, shortest_path_idx] = 1.0
-
-            self.population.append(deterministic_individual)
-            remaining_slots -= 1
-
-            num_variants = int(remaining_slots * self.heuristic_ratio)
-            num_random = remaining_slots - num_variants
+            deterministic_individual = self.population[0]
+            weights = np.zeros(self.incidence.num_genes)
+            # the path winning with weights -hops is the shortest one of its demand
+            shortest_paths = self.incidence.routing(
+                -self.incidence.path_lengths.astype(np.float64), True
+            )
+            weights[shortest_paths] = 1.0
+            deterministic_individual[:] = self.encode(weights)
+            filled = 1
 
             # other deterministic individuals (based on the first one)
             # their count is specified by heuristic_ratio variable
-            for _ in range(num_variants):
-                variant = deepcopy(deterministic_individual)
-                self.mutation(variant, self.base_sigma)
-                self.population.append(variant)
-
-            # random - the rest
-            for _ in range(num_random):
-                random_individual = np.random.rand(num_demands, max_paths)
-                self.population.append(random_individual)
-        else:
-            # random - the rest
-            for _ in range(remaining_slots):
-                random_individual = np.random.rand(num_demands, max_paths)
-                self.population.append(random_individual)
-
-    def selection(self, scores):
-        """tournament selection"""
-        selected = random.sample(range(len(self.population)), self.tournament_size)
-        best_idx = selected[0]
-        for idx in selected:
-            if scores[idx] < scores[best_idx]:
-                best_idx = idx
-
-        return self.population[best_idx]
-
-    def crossover(self, first, second):
+            num_variants = int((self.pop_size - filled) * self.heuristic_ratio)
+            for i in range(filled, filled + num_variants):
+                self.population[i] = deterministic_individual
+                self.mutation(self.population[i], self.base_sigma)
+            filled += num_variants
+
+        # seeded - e.g. baseline solutions, as many as fit
+        if self.initial_individuals is not None:
+            seeds = np.asarray(self.initial_individuals)[: self.pop_size - filled]
+            self.population[filled : filled + len(seeds)] = self.encode(seeds)
+            filled += len(seeds)
+
+        # constructed - capacity-aware greedy / GRASP / balanced routings
+        if self.seeding and filled < self.pop_size:
+            count = max(1, int((self.pop_size - filled) * self.seeding_ratio))
+            constructed = seed_population(
+                self.incidence,
+                self.modularity,
+                self.seeding,
+                count,
+                self.rng,
+                self.grasp_alpha,
+            )
+            self.population[filled : filled + len(constructed)] = self.encode(
+                constructed
+            )
+            filled += len(constructed)
+
+        # random - the rest
+        self.random_fill(self.population[filled:])
+
+        if self.adaptation == "self_adaptive":
+            self.sigmas = np.full(self.pop_size, self.base_sigma)
+            self.rates = np.full(self.pop_size, self.mutation_rate)
+        self._parent_scores = None
+
+    def empty_population(self, size, slot="population"):
+        return self.allocate(slot, (size, self.incidence.num_genes), np.float64)
+
+    def allocate(self, slot, shape, dtype):
+        """Population buffer, in the evaluator's shared memory when there is one"""
+        if self._evaluator is not None:
+            return self._evaluator.array(slot, shape, dtype)
+        return np.empty(shape, dtype=dtype)
+
+    def random_fill(self, block):
+        """Fills a block of the population with random individuals"""
+        self.rng.random(out=block)
+
+    def selection(self, scores, count=1):
+        """tournament selection: indices of the winners of `count` independent tournaments"""
+        contestants = self.rng.integers(
+            0, len(scores), size=(count, self.tournament_size)
+        )
+        winners = np.argmin(scores[contestants], axis=1)
+        return contestants[np.arange(count), winners]
+
+    def crossover(self, first, second, out=None):
         """arithmetic crossover: descendant weights based on parent's weights linear combination"""
-        return self.alpha * first + (1 - self.alpha) * second
+        # alpha * first + (1 - alpha) * second, without temporaries
+        out = np.subtract(first, second, out=out)
+        out *= self.alpha
+        out += second
+        return out
+
+    def mutation(self, individual, sigma, rate=None):
+        """
+        gaussian mutation, applied in place to a single individual or a whole block
 
-    def mutation(self, individual, sigma):
-        """gaussian mutation"""
-        mask = np.random.rand(*individual.shape) < self.mutation_rate
-        noise = np.random.normal(0, sigma, individual.shape)
-        individual[mask] += noise[mask]
+        sigma and rate are scalars or (for a block) per-individual vectors.
+        """
+        if rate is None:
+            rate = self.mutation_rate
+        if np.ndim(sigma) == 0 and np.ndim(rate) == 0:
+            mask = self.rng.random(individual.shape) < rate
+            individual[mask] += self.rng.normal(0, sigma, np.count_nonzero(mask))
+        else:
+            # per-individual values broadcast over all genes of their individual
+            genes = (1,) * (individual.ndim - 1)
+            rate = np.broadcast_to(rate, individual.shape[:1]).reshape(-1, *genes)
+            sigma = np.broadcast_to(sigma, individual.shape[:1]).reshape(-1, *genes)
+            mask = self.rng.random(individual.shape) < rate
+            scale = np.broadcast_to(sigma, individual.shape)[mask]
+            individual[mask] += self.rng.standard_normal(len(scale)) * scale
         np.clip(individual, 0.0, 1.0, out=individual)
 
-    def run(self):
-        """Main evolution loop."""
+    def adapt_strategies(self, first, second):
+        """
+        Self-adaptive step sizes of children of the given parents.
 
+        Recombined arithmetically, then perturbed log-normally (sigma) and
+        logistically (mutation rate) before being used on the children themselves.
+        """
+        count = len(first)
+        sigmas = (
+            self.alpha * self.sigmas[first] + (1 - self.alpha) * self.sigmas[second]
+        )
+        sigmas *= np.exp(self._tau * self.rng.standard_normal(count))
+        rates = self.alpha * self.rates[first] + (1 - self.alpha) * self.rates[second]
+        rates = 1.0 / (
+            1.0
+            + (1.0 - rates)
+            / rates
+            * np.exp(-self._tau * self.rng.standard_normal(count))
+        )
+        return np.clip(sigmas, *SIGMA_BOUNDS), np.clip(rates, *MUTATION_RATE_BOUNDS)
+
+    def one_fifth_rule(self, sigma, scores, lineage):
+        """Rechenberg's rule: grows sigma if over 1/5 of children beat their parent, shrinks it otherwise"""
+        if lineage is None or self._parent_scores is None:
+            return sigma
+        children = np.arange(1 if self.elitism else 0, len(scores))
+        if not len(children):
+            return sigma
+        success = np.mean(scores[children] < self._parent_scores[lineage[children]])
+        if success > 0.2:
+            sigma /= ONE_FIFTH_FACTOR
+        elif success < 0.2:
+            sigma *= ONE_FIFTH_FACTOR
+        return sigma
+
+    def restart(self, best_chromosome):
+        """Re-initializes the population, keeping only the best individual found so far"""
         self.initialize_population()
-        best_global_cost = float("inf")
-        last_improvement_gen = 0
-        best_costs_history = []
-        best_chromosome = None
-        sigma = self.base_sigma
+        if best_chromosome is not None:
+            self.population[0] = best_chromosome
+        # rows have no parents to start incremental evaluation from
+        self._loads = None
+        self.restarts += 1
+
+    def reproduce(self, scores, offspring, sigma, strategies=None):
+        """
+        Fills the offspring block in place: batched selection, crossover and mutation.
 
-        for gen in range(self.generations):
-            scores = [self.calculate_cost(individual) for individual in self.population]
+        With self-adaptation `strategies` are (sigmas, rates) vectors filled with the
+        children's own step sizes.
+        Returns the index of every child's first parent.
+        """
+        count = len(offspring)
+        with self._phase("selection"):
+            parents = self.selection(scores, 2 * count)
+        with self._phase("copy"):
+            second = self._scratch[:count]
+            np.take(self.population, parents[:count], axis=0, out=offspring)
+            np.take(self.population, parents[count:], axis=0, out=second)
+        with self._phase("crossover"):
+            self.crossover(offspring, second, out=offspring)
+        with self._phase("mutation"):
+            if strategies is not None:
+                sigmas, rates = self.adapt_strategies(parents[:count], parents[count:])
+                strategies[0][:], strategies[1][:] = sigmas, rates
+                self.mutation(offspring, sigmas, rates)
+            else:
+                self.mutation(offspring, sigma)
+        return parents[:count]
+
+    def refine_elites(self, scores):
+        """Runs local search on the best individuals, updating them and their scores in place"""
+        elites = np.argsort(scores, kind="stable")[: self.local_search_elites]
+        for i in elites.tolist():
+            weights = self.to_weights(self.population[i])
+            scores[i] = self._local_search.improve(
+                weights, self.local_search_passes, self.rng
+            )
+            self.population[i] = self.encode(weights)
+        self.evaluations += len(elites)
+        if self._known is not None:
+            # routing of refined rows changed, their children need full evaluation
+            self._known[elites] = False
+
+    def termination_check(self, best_cost, stagnation_counter, start_time):
+        """Name of the first met termination criterion, None if evolution should go on"""
+        if self.target_cost is not None and best_cost <= self.target_cost:
+            return "target_cost"
+        if (
+            self.stagnation_limit is not None
+            and stagnation_counter >= self.stagnation_limit
+        ):
+            return "stagnation"
+        if (
+            self.time_limit is not None
+            and time.perf_counter() - start_time >= self.time_limit
+        ):
+            return "time_limit"
+        if (
+            self.max_evaluations is not None
+            and self.evaluations >= self.max_evaluations
+        ):
+            return "max_evaluations"
+        return None
+
+    def summary(self):
+        """Counters describing the last run, stored next to its results"""
+        return {
+            "generations_run": self.generations_run,
+            "termination_reason": self.termination_reason,
+            "evaluations": self.evaluations,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "restarts": self.restarts,
+            "sigma_history": self.sigma_history,
+            "mutation_rate_history": self.rate_history,
+        }
+
+    def emigrants(self, scores, count):
+        """Copies of the `count` best individuals and their costs"""
+        best = np.argsort(scores, kind="stable")[:count]
+        return self.population[best].copy(), scores[best].copy()
+
+    def immigrate(self, individuals, costs, scores):
+        """Replaces the worst individuals (and their scores) with evaluated immigrants"""
+        worst = np.argsort(scores, kind="stable")[len(scores) - len(individuals) :]
+        self.population[worst] = individuals
+        scores[worst] = costs
+        if self._known is not None:
+            # loads of immigrants are unknown here, their children need full evaluation
+            self._known[worst] = False
+        if self.sigmas is not None:
+            self.sigmas[worst] = self.base_sigma
+            self.rates[worst] = self.mutation_rate
+
+    def checkpoint_settings(self):
+        """
+        Settings a checkpoint can only be resumed with.
+
+        Budgets (generations, stagnation, target cost, time and evaluation limits)
+        are left out, so they can be changed to continue a run.
+        """
+        if self._network_digest is None:
+            network = self.network
+            if not isinstance(network, CompiledNetwork):
+                network = network.compile()
+            self._network_digest = network.digest()
+        return {
+            "solver": type(self).__name__,
+            "network": self._network_digest,
+            "modularity": self.modularity,
+            "aggregation": self.aggregation,
+            "pop_size": self.pop_size,
+            "mutation_rate": self.mutation_rate,
+            "alpha": self.alpha,
+            "sigma": self.base_sigma,
+            "use_heuristic": self.use_heuristic,
+            "heuristic_ratio": self.heuristic_ratio,
+            "elitism": self.elitism,
+            "tournament_size": self.tournament_size,
+            "incremental": self.incremental,
+            "cache_size": self.cache_size,
+            "local_search_every": self.local_search_every,
+            "local_search_elites": self.local_search_elites,
+            "local_search_passes": self.local_search_passes,
+            "seeding": self.seeding,
+            "seeding_ratio": self.seeding_ratio,
+            "grasp_alpha": self.grasp_alpha,
+            "adaptation": self.adaptation,
+            "restart_after": self.restart_after,
+        }
+
+    def checkpoint_state(self, gen, lineage, loop):
+        """
+        Arrays describing the whole solver state before generation `gen`.
+
+        `loop` holds the bookkeeping of run(): best chromosome and cost, last
+        improvement and restart, stagnation counter, sigma, history and elapsed time.
+        """
+        keys = list(self._cache)
+        state = {
+            "generation": np.int64(gen),
+            "population": self.population,
+            "lineage": lineage if lineage is not None else np.empty(0, np.int64),
+            "rng_state": np.array(capture_rng_state(self.rng)),
+            "settings": np.array(capture_settings(self.checkpoint_settings())),
+            "counters": np.array(
+                [
+                    self.evaluations,
+                    self.cache_hits,
+                    self.cache_misses,
+                    self._delta_streak,
+                    self.generations_run,
+                    loop["last_improvement_gen"],
+                    loop["stagnation_counter"],
+                    loop["last_restart_gen"],
+                    self.restarts,
+                ],
+                dtype=np.int64,
+            ),
+            "best_cost": np.float64(loop["best_cost"]),
+            "sigma": np.float64(loop["sigma"]),
+            "elapsed": np.float64(loop["elapsed"]),
+            "history": np.array(loop["history"], dtype=np.int64),
+            "sigma_history": np.array(self.sigma_history, dtype=np.float64),
+            "rate_history": np.array(self.rate_history, dtype=np.float64),
+            "termination_reason": np.array(self.termination_reason or ""),
+            "cache_keys": np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(
+                -1, CACHE_KEY_SIZE
+            ),
+            "cache_costs": np.array(list(self._cache.values()), dtype=np.int64),
+        }
+        if loop["best_chromosome"] is not None:
+            state["best_chromosome"] = loop["best_chromosome"]
+        if self.sigmas is not None:
+            state["sigmas"] = self.sigmas
+            state["rates"] = self.rates
+        if self._parent_scores is not None:
+            state["parent_scores"] = self._parent_scores
+        if self._loads is not None:
+            state["routing"] = self._routing
+            state["loads"] = self._loads
+            state["costs"] = self._costs
+            state["known"] = self._known
+        return state
+
+    def restore_state(self, state):
+        """Inverse of checkpoint_state, returns the generation, lineage and loop bookkeeping"""
+        changed = []
+        if "settings" in state:
+            # (not stored by older checkpoints)
+            changed = changed_settings(state["settings"], self.checkpoint_settings())
+        if changed:
+            raise ValueError(
+                f"Checkpoint was saved with different settings ({', '.join(changed)}), "
+                "restore them or remove the checkpoint"
+            )
+        self.population = self.empty_population(len(state["population"]))
+        self.population[:] = state["population"]
+        self._offspring = self.empty_population(len(self.population), "offspring")
+        self._scratch = np.empty_like(self.population)
+        restore_rng_state(self.rng, state["rng_state"])
+        (
+            self.evaluations,
+            self.cache_hits,
+            self.cache_misses,
+            self._delta_streak,
+            self.generations_run,
+            last_improvement_gen,
+            stagnation_counter,
+            last_restart_gen,
+            self.restarts,
+        ) = state["counters"].tolist()
+        self.sigma_history = state["sigma_history"].tolist()
+        self.rate_history = state["rate_history"].tolist()
+        self.sigmas = state.get("sigmas")
+        self.rates = state.get("rates")
+        self._parent_scores = state.get("parent_scores")
+        self.termination_reason = str(state["termination_reason"]) or None
+
+        self._cache = OrderedDict(
+            (key.tobytes(), cost)
+            for key, cost in zip(state["cache_keys"], state["cache_costs"].tolist())
+        )
+        self._routing = state.get("routing")
+        self._loads = state.get("loads")
+        self._costs = state.get("costs")
+        self._known = state.get("known")
+
+        lineage = state["lineage"] if len(state["lineage"]) else None
+        best_cost = float(state["best_cost"])
+        loop = {
+            "best_chromosome": state.get("best_chromosome"),
+            # costs are ints, inf only before the first generation
+            "best_cost": best_cost if np.isinf(best_cost) else int(best_cost),
+            "last_improvement_gen": last_improvement_gen,
+            "stagnation_counter": stagnation_counter,
+            "last_restart_gen": last_restart_gen,
+            "sigma": float(state["sigma"]),
+            "history": state["history"].tolist(),
+            "elapsed": float(state["elapsed"]),
+        }
+        return int(state["generation"]), lineage, loop
+
+    def run(
+        self, callback=None, checkpoint_path=None, checkpoint_every=None, resume=False
+    ):
+        """
+        Main evolution loop.
+
+        `callback(solver, gen, scores)` is called after every evaluation, it may
+        modify the population and scores in place (e.g. migration) and stops the run
+        by returning True.
+        With checkpoint_path the full state is saved there every `checkpoint_every`
+        generations and when the run ends; with resume an existing checkpoint is
+        continued from, giving the same results as an uninterrupted run.
+        With eval_workers above 1 the evaluation pool lives as long as the run.
+        """
+        if self.eval_workers <= 1:
+            return self._evolve(callback, checkpoint_path, checkpoint_every, resume)
+
+        self._evaluator = SharedEvaluator(
+            type(self),
+            self.network,
+            self.aggregation,
+            self.modularity,
+            self.eval_workers,
+        )
+        try:
+            return self._evolve(callback, checkpoint_path, checkpoint_every, resume)
+        finally:
+            # the population leaves shared memory before its blocks are released
+            self.population = np.array(self.population)
+            self._offspring = np.empty_like(self.population)
+            self._evaluator.close()
+            self._evaluator = None
+
+    def _evolve(self, callback, checkpoint_path, checkpoint_every, resume):
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.reset()
+
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            first_gen, lineage, loop = self.restore_state(
+                load_checkpoint(checkpoint_path)
+            )
+            if metrics is not None:
+                # evaluations before the interruption belong to earlier generations
+                metrics.sync_counters(self)
+            best_chromosome = loop["best_chromosome"]
+            best_global_cost = loop["best_cost"]
+            last_improvement_gen = loop["last_improvement_gen"]
+            stagnation_counter = loop["stagnation_counter"]
+            last_restart_gen = loop["last_restart_gen"]
+            sigma = loop["sigma"]
+            best_costs_history = loop["history"]
+            start_time = time.perf_counter() - loop["elapsed"]
+        else:
+            with self._phase("initialization"):
+                self.initialize_population()
+            self._cache.clear()
+            self._loads = None
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self.evaluations = 0
+            self.termination_reason = None
+            self.restarts = 0
+            self.sigma_history = []
+            self.rate_history = []
+            first_gen = 0
+            start_time = time.perf_counter()
+            best_global_cost = float("inf")
+            last_improvement_gen = 0
+            stagnation_counter = 0
+            last_restart_gen = 0
+            best_costs_history = []
+            best_chromosome = None
+            sigma = self.base_sigma
+            lineage = None
+
+        def checkpoint(gen):
+            loop = {
+                "best_chromosome": best_chromosome,
+                "best_cost": best_global_cost,
+                "last_improvement_gen": last_improvement_gen,
+                "stagnation_counter": stagnation_counter,
+                "last_restart_gen": last_restart_gen,
+                "sigma": sigma,
+                "history": best_costs_history,
+                "elapsed": time.perf_counter() - start_time,
+            }
+            with self._phase("checkpoint"):
+                save_checkpoint(
+                    checkpoint_path, self.checkpoint_state(gen, lineage, loop)
+                )
+
+        # a run that used up its generations (its last population already reproduced)
+        # goes on when given more, one finished otherwise has nothing left to do
+        if self.termination_reason == "generations" and first_gen < self.generations:
+            self.termination_reason = None
+        generations = range(first_gen, self.generations)
+        if self.termination_reason is not None:
+            generations = []
+
+        for gen in generations:
+            if metrics is not None:
+                metrics.start_generation(gen)
+            with self._phase("evaluation"):
+                scores = self.evaluate_population(self.population, lineage)
+            with self._phase("callback"):
+                stop_requested = callback is not None and callback(self, gen, scores)
+            if self.local_search_every and gen % self.local_search_every == 0:
+                with self._phase("local_search"):
+                    self.refine_elites(scores)
+            if self.adaptation == "one_fifth":
+                sigma = self.one_fifth_rule(sigma, scores, lineage)
+            sigma = float(np.clip(sigma, *SIGMA_BOUNDS))
+            if self.sigmas is not None:
+                self.sigma_history.append(float(self.sigmas.mean()))
+                self.rate_history.append(float(self.rates.mean()))
+            else:
+                self.sigma_history.append(sigma)
+                self.rate_history.append(self.mutation_rate)
+            if metrics is not None:
+                metrics.record_population(self, scores)
 
             min_idx = np.argmin(scores)
-            min_cost = scores[min_idx]
+            min_cost = int(scores[min_idx])
 
             if min_cost < best_global_cost:
                 best_global_cost = min_cost
-                best_chromosome = deepcopy(self.population[min_idx])
+                with self._phase("copy"):
+                    best_chromosome = self.population[min_idx].copy()
                 last_improvement_gen = gen
                 stagnation_counter = 0
-                # sigma *= 0.9
-                # print(f"[DEBUG] -sigma: {sigma}")
             else:
                 stagnation_counter += 1
-                if stagnation_counter and stagnation_counter % 5 == 0:
-                    # sigma *= 1.2
-                    # print(f"[DEBUG] +sigma: {sigma}")
-                    pass
-
-            sigma = np.clip(sigma, 0.0005, 1)
 
             best_costs_history.append(best_global_cost)
+            self.generations_run = gen + 1
+
+            self.termination_reason = self.termination_check(
+                best_global_cost, stagnation_counter, start_time
+            )
+            if stop_requested:
+                self.termination_reason = "callback"
+            if self.termination_reason is not None:
+                break
+
+            if (
+                self.restart_after
+                and gen + 1 - max(last_improvement_gen + 1, last_restart_gen)
+                >= self.restart_after
+            ):
+                with self._phase("restart"):
+                    self.restart(best_chromosome)
+                lineage = None
+                sigma = self.base_sigma
+                last_restart_gen = gen + 1
+            else:
+                new_population = self._offspring
+                lineage = np.empty(self.pop_size, dtype=np.int64)
+                new_sigmas = new_rates = strategies = None
+                start = 0
+                if self.sigmas is not None:
+                    new_sigmas = np.empty(self.pop_size)
+                    new_rates = np.empty(self.pop_size)
+
+                if self.elitism:
+                    with self._phase("copy"):
+                        new_population[0] = self.population[min_idx]
+                    lineage[0] = min_idx
+                    if new_sigmas is not None:
+                        new_sigmas[0] = self.sigmas[min_idx]
+                        new_rates[0] = self.rates[min_idx]
+                    start = 1
+                if new_sigmas is not None:
+                    strategies = (new_sigmas[start:], new_rates[start:])
+
+                lineage[start:] = self.reproduce(
+                    scores,
+                    new_population[start:],
+                    sigma,
+                    strategies,
+                )
+
+                self._offspring = self.population
+                self.population = new_population
+                self._parent_scores = scores
+                if new_sigmas is not None:
+                    self.sigmas, self.rates = new_sigmas, new_rates
+
+            if (
+                checkpoint_path
+                and checkpoint_every
+                and (gen + 1) % checkpoint_every == 0
+            ):
+                checkpoint(gen + 1)
+        else:
+            if self.termination_reason is None:
+                self.termination_reason = "generations"
 
-            new_population = []
-
-            if self.elitism:
-                new_population.append(deepcopy(self.population[min_idx]))
-
-            while len(new_population) < self.pop_size:
-                parent1 = self.selection(scores)
-                parent2 = self.selection(scores)
-
-                child = self.crossover(parent1, parent2)
-                self.mutation(child, sigma)
-
-                new_population.append(child)
-
-            self.population = new_population
+        if metrics is not None:
+            metrics.end_run()
+        if checkpoint_path:
+            checkpoint(self.generations_run)
 
         return (
             best_chromosome,
@@ -0,0 +1,119 @@
+import numpy as np
+
+from .ea import EvoSolver
+from src import config
+
+ENCODINGS = ["weights", "index"]
+CROSSOVERS = ["uniform", "one_point"]
+
+
+class PathIndexSolver(EvoSolver):
+    """
+    Aggregation-only EvoSolver evolving one path index per routed demand.
+
+    Aggregation routes every demand over its highest weight path, so weights carry
+    no more information than the index of that path. Individuals are vectors of
+    small unsigned integers (rank of the chosen path within its demand):
+    - crossover is uniform or one-point, mutation moves a gene to another path
+      of its demand with probability mutation_rate (sigma is not used)
+    - decoding is an addition, every mutation changes the routing
+    Seeds, constructed individuals and local search results (weights) are
+    encoded on the way in, results are given back as one-hot weights.
+    """
+
+    def __init__(
+        self,
+        network,
+        aggregation: bool = True,
+        mutation_rate: float = config.DEFAULT_INDEX_MUTATION_RATE,
+        crossover_type: str = config.DEFAULT_CROSSOVER,
+        **kwargs,
+    ):
+        if not aggregation:
+            raise ValueError("Path index encoding only supports aggregation")
+        if crossover_type not in CROSSOVERS:
+            raise ValueError(f"Unknown crossover: {crossover_type}")
+        super().__init__(
+            network, aggregation=True, mutation_rate=mutation_rate, **kwargs
+        )
+        self.crossover_type = crossover_type
+        inc = self.incidence
+        self._num_paths = inc.num_paths[inc.routed]
+        self._movable = self._num_paths > 1
+        self.gene_dtype = np.uint8 if inc.max_paths <= 256 else np.uint16
+        self._tau = 1.0 / np.sqrt(max(len(inc.routed), 1))
+
+    def checkpoint_settings(self):
+        return dict(super().checkpoint_settings(), crossover_type=self.crossover_type)
+
+    def decode(self, population):
+        return self.incidence.segment_starts + np.asarray(population, dtype=np.int64)
+
+    def encode(self, weights):
+        weights = np.asarray(weights)
+        if weights.dtype.kind in "ui":
+            return weights.astype(self.gene_dtype)
+        routing = self.incidence.routing(weights, True)
+        return (routing - self.incidence.segment_starts).astype(self.gene_dtype)
+
+    def to_weights(self, individual):
+        weights = np.zeros(np.shape(individual)[:-1] + (self.incidence.num_genes,))
+        np.put_along_axis(weights, self.decode(individual), 1.0, axis=-1)
+        return weights
+
+    def batch_cost(self, population):
+        loads = self.incidence.routing_loads(self.decode(population), True)
+        return self.incidence.modular_cost(loads, self.modularity).astype(np.int64)
+
+    def empty_population(self, size, slot="population"):
+        return self.allocate(slot, (size, len(self.incidence.routed)), self.gene_dtype)
+
+    def random_fill(self, block):
+        block[:] = self.rng.integers(0, self._num_paths, size=block.shape)
+
+    def crossover(self, first, second, out=None):
+        """uniform or one-point crossover: every gene is copied from one of the parents"""
+        genes = first.shape[-1]
+        if self.crossover_type == "one_point":
+            cuts = self.rng.integers(1, max(genes, 2), size=first.shape[:-1] + (1,))
+            from_second = np.arange(genes) >= cuts
+        else:
+            from_second = self.rng.random(first.shape) < 0.5
+        if out is None:
+            out = first.copy()
+        elif out is not first:
+            np.copyto(out, first)
+        np.copyto(out, second, where=from_second)
+        return out
+
+    def mutation(self, individual, sigma=None, rate=None):
+        """moves mutated genes to a different, uniformly drawn path of their demand"""
+        if rate is None:
+            rate = self.mutation_rate
+        if np.ndim(rate):
+            rate = np.reshape(rate, (-1,) + (1,) * (individual.ndim - 1))
+        mask = (self.rng.random(individual.shape) < rate) & self._movable
+        counts = self._num_paths[np.nonzero(mask)[-1]]
+        shifts = self.rng.integers(1, counts) if len(counts) else counts
+        individual[mask] = (individual[mask] + shifts) % counts
+
+
+SOLVERS = {"weights": EvoSolver, "index": PathIndexSolver}
+
+
+def create_solver(network, encoding="weights", aggregation=True, **kwargs):
+    """
+    Solver of the given chromosome encoding.
+
+    Deaggregation always evolves weights, the index encoding can't split flows.
+    A mutation_rate of None stands for the default rate of the encoding.
+    """
+    if encoding not in SOLVERS:
+        raise ValueError(f"Unknown encoding: {encoding}")
+    if not aggregation:
+        encoding = "weights"
+    if encoding == "weights":
+        kwargs.pop("crossover_type", None)
+    if kwargs.get("mutation_rate", 0) is None:
+        del kwargs["mutation_rate"]
+    return SOLVERS[encoding](network, aggregation=aggregation, **kwargs)
@@ -0,0 +1,225 @@
+import numpy as np
+from .models import CompiledNetwork, Network
+
+# above this many (path x link) entries the dense incidence matrix is not built
+DENSE_INCIDENCE_LIMIT = 1 << 22
+# batched evaluation keeps temporaries of at most this many floats per chunk
+BATCH_ELEMENT_LIMIT = 1 << 22
+
+
+class PathIncidence:
+    """
+    Precompiled, integer-indexed view of demands and their admissable paths.
+
+    Built once from a Network (or its CompiledNetwork form), it replaces string keyed
+    dict walks with NumPy ops:
+    - demand d owns global paths path_offsets[d] .. path_offsets[d + 1] - 1
+    - path_indptr / path_links form a CSR path -> link incidence matrix
+    - a chromosome is a ragged, flat vector of num_genes weights, gene p being the
+      weight of global path p - no padding up to the longest path list
+    - path_mask marks real genes of the padded (num_demands x max_paths) layout used
+      by result files, path_slot maps every gene to its position in it
+    """
+
+    def __init__(self, network: Network | CompiledNetwork):
+        if isinstance(network, Network):
+            network = network.compile()
+        self.network = network
+        self.demand_ids = network.demand_ids.tolist()
+        self.link_ids = network.link_ids.tolist()
+
+        self.num_demands = network.num_demands
+        self.num_links = network.num_links
+        self.values = np.asarray(network.demand_values, dtype=np.float64)
+        self.num_paths = network.num_paths.astype(np.int64)
+        self.max_paths = int(self.num_paths.max()) if self.num_demands else 0
+
+        self.path_offsets = np.asarray(network.path_offsets, dtype=np.int64)
+        self.num_total_paths = int(self.path_offsets[-1])
+        self.path_lengths = network.path_lengths.astype(np.int64)
+        self.path_indptr = np.asarray(network.path_link_offsets, dtype=np.int64)
+        self.path_links = np.asarray(network.path_links, dtype=np.int64)
+
+        self.path_demand = np.repeat(np.arange(self.num_demands), self.num_paths)
+        path_rank = (
+            np.arange(self.num_total_paths) - self.path_offsets[self.path_demand]
+        )
+        self.path_slot = self.path_demand * self.max_paths + path_rank
+        self.path_mask = np.arange(self.max_paths) < self.num_paths[:, None]
+        self.routed = np.flatnonzero(self.num_paths > 0)
+        self.path_values = self.values[self.path_demand]
+        self.num_genes = self.num_total_paths
+
+        # genes of every routed demand form one segment, reduced with ufunc.reduceat
+        self.segment_starts = self.path_offsets[self.routed]
+        self.path_segment = np.repeat(
+            np.arange(len(self.routed)), self.num_paths[self.routed]
+        )
+        # routed demands grouped by their number of paths: genes of a group form a
+        # dense (demands x paths) index block, so argmax per demand needs no padding
+        self._path_groups = []
+        for count in np.unique(self.num_paths[self.routed]).tolist():
+            members = np.flatnonzero(self.num_paths[self.routed] == count)
+            genes = self.segment_starts[members, None] + np.arange(count)
+            self._path_groups.append((members, genes))
+
+        # uniform split used by deaggregation when all weights of a demand are 0
+        self.uniform = 1.0 / self.num_paths[self.path_demand]
+
+        # link-major ordering of incidence entries, summed with np.add.reduceat
+        entry_path = np.repeat(np.arange(self.num_total_paths), self.path_lengths)
+        order = np.argsort(self.path_links, kind="stable")
+        link_counts = np.bincount(self.path_links, minlength=self.num_links)
+        link_starts = np.cumsum(link_counts) - link_counts
+        self._entry_path_by_link = entry_path[order]
+        self._used_links = np.flatnonzero(link_counts)
+        self._link_starts = link_starts[self._used_links]
+
+        row_size = max(
+            self.num_total_paths,
+            len(self.path_links),
+            self.num_links,
+            1,
+        )
+        self.chunk_rows = max(1, BATCH_ELEMENT_LIMIT // row_size)
+
+        self._dense = None
+        if self.num_total_paths * self.num_links <= DENSE_INCIDENCE_LIMIT:
+            self._dense = np.zeros((self.num_total_paths, self.num_links))
+            np.add.at(self._dense, (entry_path, self.path_links), 1.0)
+
+    def to_matrix(self, chromosome):
+        """(..., num_genes) chromosome in the padded (..., num_demands x max_paths) layout"""
+        chromosome = np.asarray(chromosome)
+        batch_shape = chromosome.shape[:-1]
+        matrix = np.zeros(batch_shape + (self.num_demands * self.max_paths,))
+        matrix[..., self.path_slot] = chromosome
+        return matrix.reshape(batch_shape + (self.num_demands, self.max_paths))
+
+    def from_matrix(self, matrix):
+        """Inverse of to_matrix, padding genes are dropped"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        flat = matrix.reshape(matrix.shape[:-2] + (-1,))
+        return flat[..., self.path_slot]
+
+    def routing(self, chromosome, aggregation):
+        """
+        Decodes (..., num_genes) weights into the routing they describe.
+
+        Implements two scenarios:
+        - aggregation: traffic follows the path with the highest weight (not splitted),
+          the routing is the chosen global path of every routed demand.
+        - deaggregation: traffic distributed proportionally among all paths (splitted),
+          the routing is the flow on every global path.
+        """
+        chromosome = np.asarray(chromosome, dtype=np.float64)
+        if not len(self.routed):
+            shape = chromosome.shape[:-1] + (0,)
+            return np.zeros(shape, dtype=np.int64 if aggregation else np.float64)
+
+        # Aggregation - Winner takes all (the first of equal weights)
+        if aggregation:
+            chosen = np.empty(chromosome.shape[:-1] + (len(self.routed),), np.int64)
+            for members, genes in self._path_groups:
+                # running max over path ranks, much faster than argmax of short rows
+                best = chromosome[..., genes[:, 0]]
+                rank = np.zeros(best.shape, dtype=np.int64)
+                for j in range(1, genes.shape[1]):
+                    weights = chromosome[..., genes[:, j]]
+                    np.copyto(rank, j, where=weights > best)
+                    np.maximum(best, weights, out=best)
+                chosen[..., members] = self.segment_starts[members] + rank
+            return chosen
+
+        # Deaggregation - Flow proportional to weights
+        totals = np.add.reduceat(chromosome, self.segment_starts, axis=-1)[
+            ..., self.path_segment
+        ]
+        ratios = np.divide(
+            chromosome,
+            totals,
+            out=np.broadcast_to(self.uniform, chromosome.shape).copy(),
+            where=totals > 0,
+        )
+        return ratios * self.path_values
+
+    def routing_flows(self, routing, aggregation):
+        """Flow on every global path for a routing returned by routing()."""
+        if not aggregation:
+            return routing
+
+        flows = np.zeros(routing.shape[:-1] + (self.num_total_paths,))
+        np.put_along_axis(
+            flows,
+            routing,
+            np.broadcast_to(self.values[self.routed], routing.shape),
+            axis=-1,
+        )
+        return flows
+
+    def path_flows(self, chromosome, aggregation):
+        """Translates (..., num_genes) weights into flow on every global path."""
+        return self.routing_flows(self.routing(chromosome, aggregation), aggregation)
+
+    def link_loads(self, path_flows):
+        """Sums path flows into (..., num_links) link loads."""
+        if self._dense is not None:
+            return path_flows @ self._dense
+
+        loads = np.zeros(path_flows.shape[:-1] + (self.num_links,))
+        if len(self._used_links):
+            per_entry = path_flows[..., self._entry_path_by_link]
+            loads[..., self._used_links] = np.add.reduceat(
+                per_entry, self._link_starts, axis=-1
+            )
+        return loads
+
+    def entries(self, paths):
+        """Positions in path_links of the links of given paths, concatenated in order."""
+        lengths = self.path_lengths[paths]
+        starts = self.path_indptr[paths] - (np.cumsum(lengths) - lengths)
+        return np.repeat(starts, lengths) + np.arange(lengths.sum())
+
+    def link_deltas(self, rows, paths, deltas):
+        """
+        Sums flow changes of (row, path) pairs into load changes of (row, link) pairs.
+
+        Returns rows, link indices and load changes of every touched (row, link) pair;
+        work is proportional to the number of changed paths, not to the whole network.
+        """
+        lengths = self.path_lengths[paths]
+        entry_rows = np.repeat(rows, lengths)
+        keys, inverse = np.unique(
+            entry_rows * self.num_links + self.path_links[self.entries(paths)],
+            return_inverse=True,
+        )
+        changes = np.bincount(inverse, weights=np.repeat(deltas, lengths))
+        return keys // self.num_links, keys % self.num_links, changes
+
+    def routing_loads(self, routing, aggregation):
+        """Link loads of a batch of routings, computed in chunks."""
+        loads = np.empty(routing.shape[:-1] + (self.num_links,))
+        for start in range(0, len(routing), self.chunk_rows):
+            block = routing[start : start + self.chunk_rows]
+            flows = self.routing_flows(block, aggregation)
+            loads[start : start + len(block)] = self.link_loads(flows)
+        return loads
+
+    def batch_cost(self, population, aggregation, modularity):
+        """Costs of a whole (pop x num_genes) population, computed in chunks."""
+        costs = np.empty(len(population), dtype=np.int64)
+        for start in range(0, len(population), self.chunk_rows):
+            block = population[start : start + self.chunk_rows]
+            loads = self.link_loads(self.path_flows(block, aggregation))
+            costs[start : start + len(block)] = self.modular_cost(loads, modularity)
+        return costs
+
+    @staticmethod
+    def modules(loads, modularity):
+        """Number of modules needed to carry every given load."""
+        return np.ceil(np.round(loads, 6) / modularity)
+
+    @staticmethod
+    def modular_cost(loads, modularity):
+        """Number of modules needed to carry given loads (summed over the last axis)."""
+        return PathIncidence.modules(loads, modularity).sum(axis=-1)
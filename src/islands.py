@@ -0,0 +1,213 @@
+import multiprocessing
+import queue
+from collections import defaultdict, deque
+
+import numpy as np
+
+from .encodings import create_solver
+from .metrics import RunMetrics
+from src import config
+
+TOPOLOGIES = ["ring", "full"]
+# seconds between checks of whether all islands have finished, see Migration.close
+FINISH_POLL_INTERVAL = 0.05
+
+
+def migration_targets(topology, num_islands):
+    """Islands every island sends its emigrants to"""
+    if topology == "ring":
+        return [[(i + 1) % num_islands] for i in range(num_islands)]
+    if topology == "full":
+        return [[j for j in range(num_islands) if j != i] for i in range(num_islands)]
+    raise ValueError(f"Unknown migration topology: {topology}")
+
+
+class Migration:
+    """
+    EvoSolver.run callback exchanging the best individuals between islands.
+
+    Every `interval` generations the island sends its `size` best individuals to its
+    targets and blocks until it has heard from all of its (still running) sources;
+    the immigrants replace its worst individuals.
+    `finished` is a shared flag per island, set once it has stopped evolving.
+    """
+
+    def __init__(self, index, targets, sources, inboxes, finished, interval, size):
+        self.index = index
+        self.targets = targets
+        self.sources = set(sources)
+        self.inboxes = inboxes
+        self.finished = finished
+        self.interval = interval
+        self.size = size
+        self.closed = set()
+        # messages from sources that are already one migration ahead of this island
+        self.pending = defaultdict(deque)
+
+    def __call__(self, solver, gen, scores):
+        if gen == 0 or gen % self.interval:
+            return False
+
+        individuals, costs = solver.emigrants(scores, self.size)
+        for target in self.targets:
+            self.inboxes[target].put((self.index, individuals, costs))
+
+        immigrants = []
+        for sender in self.sources:
+            message = self._receive(sender)
+            if message is not None:
+                immigrants.append(message)
+
+        if immigrants:
+            individuals = np.concatenate([ind for ind, _ in immigrants])
+            costs = np.concatenate([c for _, c in immigrants])
+            # never replace more than the non-elite part of the population
+            keep = min(len(costs), len(scores) - 1)
+            best = np.argsort(costs, kind="stable")[:keep]
+            solver.immigrate(individuals[best], costs[best], scores)
+        return False
+
+    def _receive(self, sender):
+        """Next message of a given sender, None once it has finished"""
+        inbox = self.inboxes[self.index]
+        while not self.pending[sender] and sender not in self.closed:
+            other, individuals, costs = inbox.get()
+            if individuals is None:
+                self.closed.add(other)
+            else:
+                self.pending[other].append((individuals, costs))
+        if self.pending[sender]:
+            return self.pending[sender].popleft()
+        return None
+
+    def close(self):
+        """
+        Tells targets not to wait for this island anymore.
+
+        Queued messages are written to the pipes by a background thread, so the
+        island stays alive until every island has finished - exiting earlier could
+        drop the end marker a target is still waiting for. Meanwhile its own inbox
+        is emptied, so no sender ever blocks on a full pipe.
+        """
+        for target in self.targets:
+            self.inboxes[target].put((self.index, None, None))
+        self.finished[self.index] = 1
+        inbox = self.inboxes[self.index]
+        while not all(self.finished[:]):
+            try:
+                inbox.get(timeout=FINISH_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        # nobody reads the inboxes anymore, do not block exit on leftovers
+        for target in self.targets:
+            self.inboxes[target].cancel_join_thread()
+
+
+def _island_main(
+    index, network, seed, solver_kwargs, migration, results, collect_metrics
+):
+    try:
+        metrics = RunMetrics() if collect_metrics else None
+        solver = create_solver(network, rng=seed, metrics=metrics, **solver_kwargs)
+        best_chrom, *outcome = solver.run(callback=migration)
+        if best_chrom is not None:
+            best_chrom = solver.to_weights(best_chrom)
+        outcome = (best_chrom, *outcome)
+        summary = solver.summary()
+        if metrics is not None:
+            summary["metrics"] = metrics.to_dict()
+        results.put((index, outcome, summary))
+    except Exception as e:
+        results.put((index, None, f"{type(e).__name__}: {e}"))
+        raise
+    finally:
+        migration.close()
+
+
+def run_islands(
+    network,
+    seed=None,
+    num_islands: int = config.DEFAULT_ISLANDS,
+    topology: str = config.DEFAULT_TOPOLOGY,
+    migration_interval: int = config.DEFAULT_MIGRATION_INTERVAL,
+    migration_size: int = config.DEFAULT_MIGRATION_SIZE,
+    island_params=None,
+    collect_metrics=False,
+    **solver_kwargs,
+):
+    """
+    Island model: independent EvoSolver populations in separate processes,
+    periodically exchanging their best individuals through queues.
+
+    `island_params` is an optional list of per-island overrides of solver_kwargs
+    (e.g. different sigma, alpha or mutation_rate), used cyclically.
+    With collect_metrics every island summary includes its RunMetrics.
+    Returns the same tuple as EvoSolver.run (for the best island, with a history of
+    the best cost over all islands) and a summary including every island.
+    """
+    ctx = multiprocessing.get_context()
+    targets = migration_targets(topology, num_islands)
+    sources = [
+        [i for i in range(num_islands) if j in targets[i]] for j in range(num_islands)
+    ]
+    inboxes = [ctx.Queue() for _ in range(num_islands)]
+    results = ctx.Queue()
+    finished = ctx.Array("b", num_islands)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(num_islands)
+
+    processes = []
+    for i in range(num_islands):
+        kwargs = dict(solver_kwargs)
+        if island_params:
+            kwargs.update(island_params[i % len(island_params)])
+        migration = Migration(
+            i,
+            targets[i],
+            sources[i],
+            inboxes,
+            finished,
+            migration_interval,
+            migration_size,
+        )
+        process = ctx.Process(
+            target=_island_main,
+            args=(i, network, seeds[i], kwargs, migration, results, collect_metrics),
+        )
+        process.start()
+        processes.append(process)
+
+    outcomes = [None] * num_islands
+    summaries = [None] * num_islands
+    try:
+        for _ in range(num_islands):
+            index, outcome, summary = results.get()
+            outcomes[index] = outcome
+            summaries[index] = summary
+    finally:
+        for process in processes:
+            process.join()
+
+    for index, outcome in enumerate(outcomes):
+        if outcome is None:
+            raise RuntimeError(f"Island {index} failed: {summaries[index]}")
+
+    winner = min(range(num_islands), key=lambda i: outcomes[i][1])
+    best_chrom, best, conv, _ = outcomes[winner]
+
+    # best cost over all islands, islands that stopped early keep their last value
+    histories = [outcome[3] for outcome in outcomes]
+    length = max(len(h) for h in histories)
+    padded = [h + [h[-1]] * (length - len(h)) for h in histories]
+    history = np.min(padded, axis=0).tolist()
+
+    summary = {
+        "generations_run": max(s["generations_run"] for s in summaries),
+        "termination_reason": summaries[winner]["termination_reason"],
+        "evaluations": sum(s["evaluations"] for s in summaries),
+        "cache_hits": sum(s["cache_hits"] for s in summaries),
+        "cache_misses": sum(s["cache_misses"] for s in summaries),
+        "islands": summaries,
+    }
+    return (best_chrom, best, conv, history), summary
@@ -0,0 +1,166 @@
+import numpy as np
+
+from .incidence import PathIncidence
+
+
+class LocalSearch:
+    """
+    Memetic refinement of single individuals, working on link loads directly.
+
+    - aggregation: every demand is greedily re-routed to the admissable path giving
+      the biggest drop of the modular cost.
+    - deaggregation: flow of a demand is shifted from one path to another, either
+      whole or just enough to fill the free capacity of already installed modules.
+    Moves are scored only on the links they touch, loads are updated in place.
+    """
+
+    def __init__(self, incidence: PathIncidence, aggregation, modularity):
+        self.incidence = incidence
+        self.aggregation = aggregation
+        self.modularity = modularity
+
+    def improve(self, individual, passes=1, rng=None):
+        """Refines a (num_genes) individual in place, returns its new cost"""
+        inc = self.incidence
+        rng = np.random.default_rng(rng)
+        routing = inc.routing(individual, self.aggregation)
+        loads = inc.link_loads(inc.routing_flows(routing, self.aggregation))
+
+        for _ in range(passes):
+            order = rng.permutation(len(inc.routed))
+            if self.aggregation:
+                improved = self._reroute(individual, routing, loads, order)
+            else:
+                improved = self._shift(individual, routing, loads, inc.routed[order])
+            if not improved:
+                break
+
+        # recomputed from scratch, so rounding of in-place updates never leaks out
+        return int(
+            inc.modular_cost(
+                inc.link_loads(inc.path_flows(individual, self.aggregation)),
+                self.modularity,
+            )
+        )
+
+    def _move(self, source, targets):
+        """
+        Links changed by moving flow from the source path to each target path.
+
+        Returns the target index, link and direction (-1 / +1) of every change;
+        links used by both paths keep their load and are left out.
+        """
+        inc = self.incidence
+        source_links = inc.path_links[inc.entries(np.array([source]))]
+        target_links = inc.path_links[inc.entries(targets)]
+        target_owner = np.repeat(np.arange(len(targets)), inc.path_lengths[targets])
+        source_owner = np.repeat(np.arange(len(targets)), len(source_links))
+        source_links = np.tile(source_links, len(targets))
+
+        source_keys = source_owner * inc.num_links + source_links
+        target_keys = target_owner * inc.num_links + target_links
+        keep_source = ~np.isin(source_keys, target_keys)
+        keep_target = ~np.isin(target_keys, source_keys)
+
+        owners = np.concatenate([source_owner[keep_source], target_owner[keep_target]])
+        links = np.concatenate([source_links[keep_source], target_links[keep_target]])
+        signs = np.concatenate(
+            [-np.ones(keep_source.sum()), np.ones(keep_target.sum())]
+        )
+        return owners, links, signs
+
+    def _cost_changes(self, loads, owners, links, signs, amounts):
+        """Modular cost change of every move, amounts are per target"""
+        old = loads[links]
+        new = old + signs * amounts[owners]
+        modules = self.incidence.modules
+        changes = modules(new, self.modularity) - modules(old, self.modularity)
+        return np.bincount(owners, weights=changes, minlength=len(amounts))
+
+    def _reroute(self, individual, chosen, loads, order):
+        inc = self.incidence
+        improved = False
+        for r in order.tolist():
+            d = inc.routed[r]
+            start, end = inc.path_offsets[d], inc.path_offsets[d + 1]
+            if end - start < 2:
+                continue
+
+            source = chosen[r]
+            targets = np.arange(start, end)
+            owners, links, signs = self._move(source, targets)
+            amounts = np.full(len(targets), inc.values[d])
+            changes = self._cost_changes(loads, owners, links, signs, amounts)
+            best = int(np.argmin(changes))
+            if changes[best] >= 0:
+                continue
+
+            moved = owners == best
+            np.add.at(loads, links[moved], signs[moved] * inc.values[d])
+            chosen[r] = targets[best]
+            self._select_path(individual[start:end], source - start, best)
+            improved = True
+        return improved
+
+    @staticmethod
+    def _select_path(weights, current, new):
+        """Makes `new` the strictly highest weight, keeping the weights as they were"""
+        weights[current], weights[new] = weights[new], weights[current]
+        if np.argmax(weights) != new:
+            others = np.arange(len(weights)) != new
+            weights[new] = 1.0
+            weights[others] = np.minimum(weights[others], np.nextafter(1.0, 0.0))
+
+    def _shift(self, individual, flows, loads, demands):
+        inc = self.incidence
+        m = self.modularity
+        improved = False
+        for d in demands.tolist():
+            start, end = inc.path_offsets[d], inc.path_offsets[d + 1]
+            value = inc.values[d]
+            if end - start < 2 or value <= 0:
+                continue
+
+            changed = False
+            for source in range(start, end):
+                flow = flows[source]
+                if flow <= 0:
+                    continue
+                targets = np.array([p for p in range(start, end) if p != source])
+                owners, links, signs = self._move(source, targets)
+
+                # free capacity of installed modules on links gaining flow
+                slack = np.full(len(targets), np.inf)
+                gaining = signs > 0
+                room = inc.modules(loads[links], m) * m - loads[links]
+                np.minimum.at(slack, owners[gaining], room[gaining])
+
+                candidates = [
+                    np.full(len(targets), flow),
+                    np.clip(slack, 0.0, flow),
+                ]
+                best_change, best_target, best_amount = 0.0, None, 0.0
+                for amounts in candidates:
+                    changes = self._cost_changes(loads, owners, links, signs, amounts)
+                    changes[amounts <= 0] = 0.0
+                    t = int(np.argmin(changes))
+                    if changes[t] < best_change:
+                        best_change, best_target, best_amount = (
+                            changes[t],
+                            t,
+                            amounts[t],
+                        )
+                if best_target is None:
+                    continue
+
+                moved = owners == best_target
+                np.add.at(loads, links[moved], signs[moved] * best_amount)
+                flows[source] -= best_amount
+                flows[targets[best_target]] += best_amount
+                changed = True
+
+            if changed:
+                # weights equal to the flow ratios decode back to the same flows
+                individual[start:end] = np.clip(flows[start:end] / value, 0.0, 1.0)
+                improved = True
+        return improved
@@ -0,0 +1,112 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+_UNTIMED = nullcontext()
+
+
+def untimed(name):
+    """Phase timer used by EvoSolver when instrumentation is disabled"""
+    return _UNTIMED
+
+
+class RunMetrics:
+    """
+    Opt-in per-generation instrumentation of EvoSolver.run.
+
+    Every generation records the wall time of its phases (evaluation, callback,
+    selection, crossover, mutation, copy), evaluation and cache counters, cost
+    statistics and population diversity (mean per-gene standard deviation).
+    """
+
+    def __init__(self, diversity: bool = True):
+        # diversity costs about as much as one population copy per generation
+        self.diversity = diversity
+        self.reset()
+
+    def reset(self):
+        self.setup = defaultdict(float)
+        self.generations = []
+        self._phases = self.setup
+        self._generation_start = None
+        self._counters = (0, 0, 0)
+
+    def sync_counters(self, solver):
+        """Counts work from the solver's current counters on (e.g. restored from a checkpoint)"""
+        self._counters = (solver.evaluations, solver.cache_hits, solver.cache_misses)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] += time.perf_counter() - start
+
+    def start_generation(self, gen):
+        self._close_generation()
+        self._phases = defaultdict(float)
+        self.generations.append({"generation": gen, "phases": self._phases})
+        self._generation_start = time.perf_counter()
+
+    def record_population(self, solver, scores):
+        """Counters and statistics of a freshly evaluated population"""
+        record = self.generations[-1]
+        counters = (solver.evaluations, solver.cache_hits, solver.cache_misses)
+        evaluations, hits, misses = np.subtract(counters, self._counters).tolist()
+        self._counters = counters
+
+        record["evaluations"] = evaluations
+        record["cache_hits"] = hits
+        record["cache_misses"] = misses
+        record["cache_hit_rate"] = hits / (hits + misses) if hits + misses else None
+        record["best_cost"] = int(np.min(scores))
+        record["mean_cost"] = float(np.mean(scores))
+        if solver.sigma_history:
+            record["sigma"] = solver.sigma_history[-1]
+            record["mutation_rate"] = solver.rate_history[-1]
+        if self.diversity:
+            genes = solver.population
+            record["diversity"] = float(genes.std(axis=0).mean()) if genes.size else 0.0
+
+    def end_run(self):
+        self._close_generation()
+        self._phases = self.setup
+
+    def _close_generation(self):
+        if self._generation_start is not None:
+            self.generations[-1]["time"] = time.perf_counter() - self._generation_start
+            self._generation_start = None
+
+    def totals(self):
+        """Phase times and counters summed over all generations"""
+        phases = defaultdict(float)
+        for record in self.generations:
+            for name, seconds in record["phases"].items():
+                phases[name] += seconds
+        hits = sum(r.get("cache_hits", 0) for r in self.generations)
+        misses = sum(r.get("cache_misses", 0) for r in self.generations)
+        return {
+            "generations": len(self.generations),
+            "time": sum(r.get("time", 0.0) for r in self.generations),
+            "phases": dict(phases),
+            "evaluations": sum(r.get("evaluations", 0) for r in self.generations),
+            "cache_hit_rate": hits / (hits + misses) if hits + misses else None,
+        }
+
+    def to_dict(self):
+        return {
+            "setup": dict(self.setup),
+            "totals": self.totals(),
+            "generations": [
+                dict(record, phases=dict(record["phases"]))
+                for record in self.generations
+            ],
+        }
+
+    def save(self, file_path):
+        with open(file_path, "w") as fh:
+            json.dump(self.to_dict(), fh, indent=4)
@@ -1,6 +1,10 @@
+import hashlib
+import os
 from dataclasses import dataclass, field
 from typing import List
 
+import numpy as np
+
 
 @dataclass
 class Node:
@@ -39,3 +43,166 @@ class Network:
 
     def add_demand(self, demand: Demand):
         self.demands[demand.id] = demand
+
+    def compile(self) -> "CompiledNetwork":
+        return CompiledNetwork.from_network(self)
+
+
+class CompiledNetwork:
+    """
+    Read-only, integer indexed struct-of-arrays form of a Network.
+
+    Nodes, links and demands are referred to by their position; admissable paths of
+    demand d are paths path_offsets[d] .. path_offsets[d + 1] - 1 and links of path p
+    are path_links[path_link_offsets[p] : path_link_offsets[p + 1]].
+    """
+
+    __slots__ = (
+        "node_ids",
+        "node_xy",
+        "link_ids",
+        "link_ends",
+        "demand_ids",
+        "demand_ends",
+        "demand_values",
+        "path_offsets",
+        "path_link_offsets",
+        "path_links",
+    )
+
+    def __init__(self, **arrays):
+        for name in self.__slots__:
+            array = np.asarray(arrays[name])
+            if array.flags.writeable:
+                array = array.view()
+                array.flags.writeable = False
+            object.__setattr__(self, name, array)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledNetwork is read-only")
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_links(self):
+        return len(self.link_ids)
+
+    @property
+    def num_demands(self):
+        return len(self.demand_ids)
+
+    @property
+    def num_paths(self):
+        """Number of admissable paths of every demand"""
+        return np.diff(self.path_offsets)
+
+    @property
+    def path_lengths(self):
+        """Number of links of every path"""
+        return np.diff(self.path_link_offsets)
+
+    @classmethod
+    def from_network(cls, network: Network) -> "CompiledNetwork":
+        node_index = {node_id: i for i, node_id in enumerate(network.nodes)}
+        link_index = {link_id: i for i, link_id in enumerate(network.links)}
+        demands = list(network.demands.values())
+        paths = [path for d in demands for path in d.admissable_paths]
+
+        return cls(
+            node_ids=np.array(list(network.nodes), dtype=str),
+            node_xy=np.array(
+                [(n.x, n.y) for n in network.nodes.values()], dtype=np.float64
+            ).reshape(-1, 2),
+            link_ids=np.array(list(network.links), dtype=str),
+            link_ends=np.array(
+                [
+                    (node_index[link.source], node_index[link.target])
+                    for link in network.links.values()
+                ],
+                dtype=np.int32,
+            ).reshape(-1, 2),
+            demand_ids=np.array([d.id for d in demands], dtype=str),
+            demand_ends=np.array(
+                [(node_index[d.source], node_index[d.target]) for d in demands],
+                dtype=np.int32,
+            ).reshape(-1, 2),
+            demand_values=np.array([d.value for d in demands], dtype=np.float64),
+            path_offsets=np.cumsum(
+                [0] + [len(d.admissable_paths) for d in demands], dtype=np.int64
+            ),
+            path_link_offsets=np.cumsum(
+                [0] + [len(path) for path in paths], dtype=np.int64
+            ),
+            path_links=np.array(
+                [link_index[link_id] for path in paths for link_id in path],
+                dtype=np.int32,
+            ),
+        )
+
+    def to_network(self) -> Network:
+        node_ids = self.node_ids.tolist()
+        link_ids = self.link_ids.tolist()
+        path_offsets = self.path_offsets.tolist()
+        path_link_offsets = self.path_link_offsets.tolist()
+        path_link_ids = np.array(link_ids, dtype=object)[self.path_links].tolist()
+
+        network = Network()
+        for node_id, (x, y) in zip(node_ids, self.node_xy.tolist()):
+            network.add_node(Node(id=node_id, x=x, y=y))
+        for link_id, (src, trg) in zip(link_ids, self.link_ends.tolist()):
+            network.add_link(
+                Link(id=link_id, source=node_ids[src], target=node_ids[trg])
+            )
+
+        demand_ends = self.demand_ends.tolist()
+        demand_values = self.demand_values.tolist()
+        for i, demand_id in enumerate(self.demand_ids.tolist()):
+            src, trg = demand_ends[i]
+            paths = [
+                path_link_ids[path_link_offsets[p] : path_link_offsets[p + 1]]
+                for p in range(path_offsets[i], path_offsets[i + 1])
+            ]
+            network.add_demand(
+                Demand(
+                    id=demand_id,
+                    source=node_ids[src],
+                    target=node_ids[trg],
+                    value=demand_values[i],
+                    admissable_paths=paths,
+                )
+            )
+        return network
+
+    def digest(self) -> str:
+        """Hash of the content, identifies the same network across reloads and processes"""
+        digest = hashlib.blake2b(digest_size=16)
+        for name in self.__slots__:
+            array = np.ascontiguousarray(getattr(self, name))
+            digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+            digest.update(array.data)
+        return digest.hexdigest()
+
+    def save(self, directory: str):
+        """Writes every array as a separate .npy file, so they can be memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.__slots__:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r") -> "CompiledNetwork":
+        return cls(
+            **{
+                name: np.load(
+                    os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode
+                )
+                for name in cls.__slots__
+            }
+        )
@@ -0,0 +1,179 @@
+import multiprocessing
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def _evaluate_slices(conn, solver_class, network, aggregation, modularity):
+    """
+    Worker loop: evaluates row slices of shared populations until told to stop.
+
+    Tasks only carry block names and slice bounds, the rows themselves are read
+    from (and costs written to) shared memory in place. Blocks stay attached across
+    tasks until a task lists them as released by the parent.
+    """
+    solver = solver_class(network, aggregation=aggregation, modularity=modularity)
+    blocks = {}
+
+    def attach(name, shape, dtype):
+        if name not in blocks:
+            blocks[name] = SharedMemory(name=name)
+        return np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        released, population_block, costs_block, rows_block, start, stop = task
+        for name in released:
+            block = blocks.pop(name, None)
+            if block is not None:
+                block.close()
+        try:
+            population = attach(*population_block)
+            costs = attach(*costs_block)
+            if rows_block is None:
+                costs[start:stop] = solver.batch_cost(population[start:stop])
+            else:
+                rows = attach(*rows_block)[start:stop]
+                costs[rows] = solver.batch_cost(population[rows])
+            del population, costs
+            conn.send(None)
+        except Exception as e:
+            conn.send(f"{type(e).__name__}: {e}")
+    for block in blocks.values():
+        block.close()
+
+
+class SharedEvaluator:
+    """
+    Evaluation backend: a persistent pool of processes evaluating a population in place.
+
+    Populations live in multiprocessing.shared_memory blocks handed out by array();
+    every evaluation splits the rows into one contiguous slice per worker and only
+    sends slice bounds, costs come back through a shared cost vector.
+    """
+
+    def __init__(self, solver_class, network, aggregation, modularity, workers):
+        ctx = multiprocessing.get_context()
+        # workers have to share the tracker, one of their own would unlink the
+        # blocks they attached to as leaked when they exit
+        resource_tracker.ensure_running()
+        self._blocks = {}
+        self._connections = []
+        self._processes = []
+        # per worker, names of blocks released since its last task
+        self._released = []
+        for _ in range(workers):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(
+                target=_evaluate_slices,
+                args=(child, solver_class, network, aggregation, modularity),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+            self._released.append([])
+
+    def array(self, slot, shape, dtype=np.float64):
+        """Array backed by the shared block of a slot, reused while it fits"""
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        block = self._blocks.get(slot)
+        if block is None or block[1].shape != shape or block[1].dtype != dtype:
+            self._release(slot)
+            size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+            memory = SharedMemory(create=True, size=size)
+            block = (memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf))
+            self._blocks[slot] = block
+        return block[1]
+
+    def _describe(self, array):
+        """(name, shape, dtype) of the shared block holding exactly this array"""
+        for memory, block in self._blocks.values():
+            if (
+                block.shape == array.shape
+                and block.dtype == array.dtype
+                and block.ctypes.data == array.ctypes.data
+            ):
+                return memory.name, array.shape, array.dtype.str
+        return None
+
+    def evaluate(self, population, rows=None):
+        """Costs of population rows (all of them by default), computed by the workers"""
+        described = self._describe(population)
+        if described is None:
+            # not allocated here - one copy into the staging block
+            staging = self.array("staging", population.shape, population.dtype)
+            staging[:] = population
+            described = self._describe(staging)
+        costs = self.array("costs", (len(population),), np.int64)
+        count = len(population) if rows is None else len(rows)
+        rows_block = None
+        if rows is not None:
+            shared_rows = self.array("rows", (count,), np.int64)
+            shared_rows[:] = rows
+            rows_block = self._describe(shared_rows)
+
+        bounds = np.linspace(0, count, len(self._connections) + 1).astype(int)
+        busy = []
+        for conn, released, start, stop in zip(
+            self._connections, self._released, bounds[:-1], bounds[1:]
+        ):
+            if stop > start:
+                conn.send(
+                    (
+                        released,
+                        described,
+                        self._describe(costs),
+                        rows_block,
+                        int(start),
+                        int(stop),
+                    )
+                )
+                released.clear()
+                busy.append(conn)
+        errors = [error for error in (conn.recv() for conn in busy) if error]
+        if errors:
+            raise RuntimeError(f"Evaluation worker failed: {errors[0]}")
+        return costs.copy() if rows is None else costs[rows]
+
+    def _release(self, slot):
+        block = self._blocks.pop(slot, None)
+        if block is None:
+            return
+        memory, array = block
+        for released in self._released:
+            released.append(memory.name)
+        del array
+        try:
+            memory.close()
+        except BufferError:
+            # views of the block are still alive, the mapping goes away with them
+            pass
+        memory.unlink()
+
+    def close(self):
+        for conn in self._connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join()
+        for conn in self._connections:
+            conn.close()
+        for slot in list(self._blocks):
+            self._release(slot)
+        self._connections = []
+        self._processes = []
+        self._released = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
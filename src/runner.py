@@ -0,0 +1,196 @@
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .encodings import create_solver
+from .islands import run_islands
+from .metrics import RunMetrics
+from .baseline import solve_baseline
+from .models import CompiledNetwork
+
+# network shared with pool workers, set once per worker process by _init_worker
+_worker_network = None
+# baselines already solved by this process, keyed on (network content, modularity,
+# options); least recently used ones are dropped above BASELINE_CACHE_SIZE
+BASELINE_CACHE_SIZE = 32
+_baselines = OrderedDict()
+
+
+def _init_worker(network):
+    global _worker_network
+    _worker_network = network
+
+
+def _solve_task(task):
+    return solve(_worker_network, *task)
+
+
+def spawn_seeds(base_seed, num_cells, repeats):
+    """
+    Independent SeedSequence of every repeat of every grid cell, spawned from one seed.
+
+    Streams depend only on (base_seed, cell index, repeat), never on scheduling.
+    """
+    cells = np.random.SeedSequence(base_seed).spawn(num_cells)
+    return [cell.spawn(repeats) for cell in cells]
+
+
+def seed_label(seed):
+    """Stable file name fragment of an int seed or a spawned SeedSequence"""
+    if isinstance(seed, np.random.SeedSequence):
+        return "_".join(str(part) for part in (seed.entropy, *seed.spawn_key))
+    return str(seed)
+
+
+def cached_baseline(network, modularity, method="lp", time_limit=None):
+    """Deaggregation baseline of a cell, solved once per process"""
+    compiled = network if isinstance(network, CompiledNetwork) else network.compile()
+    # content, not id() - a long-lived process reloads changed files
+    key = (compiled.digest(), modularity, method, time_limit)
+    if key in _baselines:
+        _baselines.move_to_end(key)
+    else:
+        _baselines[key] = solve_baseline(
+            compiled, modularity, integer=method == "milp", time_limit=time_limit
+        )
+        if len(_baselines) > BASELINE_CACHE_SIZE:
+            _baselines.popitem(last=False)
+    return _baselines[key]
+
+
+def solve(
+    network,
+    aggregation,
+    modularity,
+    seed,
+    solver_kwargs,
+    island_kwargs=None,
+    collect_metrics=False,
+    checkpoint_kwargs=None,
+    baseline_kwargs=None,
+    callback=None,
+):
+    """
+    Single seeded EvoSolver run, returns its results, the wall time it took and its summary.
+
+    `seed` (an int or SeedSequence) is the only source of randomness of the run.
+    With island_kwargs asking for more than one island the run is an island model.
+    With collect_metrics the summary includes per-generation RunMetrics of the run.
+    checkpoint_kwargs (directory, every, resume) make the run save its state to
+    a file of its own in directory, and continue from it when resume is set.
+    baseline_kwargs (method, time_limit) seed deaggregation runs with the LP/MILP
+    baseline, whose lower bound also stops the run unless target_cost is set.
+    `callback` is passed on to EvoSolver.run (progress reports, cancellation).
+    """
+    baseline = None
+    if baseline_kwargs and not aggregation:
+        baseline = cached_baseline(network, modularity, **baseline_kwargs)
+        solver_kwargs = dict(
+            solver_kwargs, initial_individuals=baseline.chromosome[None]
+        )
+        if solver_kwargs.get("target_cost") is None:
+            solver_kwargs["target_cost"] = baseline.lower_bound
+
+    if island_kwargs and island_kwargs.get("num_islands", 1) > 1:
+        if checkpoint_kwargs:
+            raise ValueError("Checkpoints are not supported for island runs")
+        if callback is not None:
+            raise ValueError("Callbacks are not supported for island runs")
+        start_time = time.time()
+        outcome, summary = run_islands(
+            network,
+            seed=seed,
+            modularity=modularity,
+            aggregation=aggregation,
+            collect_metrics=collect_metrics,
+            **island_kwargs,
+            **solver_kwargs,
+        )
+        _add_baseline(summary, baseline)
+        return (*outcome, time.time() - start_time, summary)
+
+    metrics = RunMetrics() if collect_metrics else None
+    solver = create_solver(
+        network,
+        modularity=modularity,
+        aggregation=aggregation,
+        rng=seed,
+        metrics=metrics,
+        **solver_kwargs,
+    )
+
+    run_kwargs = dict(callback=callback)
+    if checkpoint_kwargs:
+        mode = "agg" if aggregation else "deagg"
+        run_kwargs.update(
+            checkpoint_path=os.path.join(
+                checkpoint_kwargs["directory"],
+                f"{mode}_m{modularity:g}_seed{seed_label(seed)}.npz",
+            ),
+            checkpoint_every=checkpoint_kwargs.get("every"),
+            resume=checkpoint_kwargs.get("resume", False),
+        )
+
+    start_time = time.time()
+    best_chrom, best, conv, history = solver.run(**run_kwargs)
+    end_time = time.time()
+    if best_chrom is not None:
+        best_chrom = solver.to_weights(best_chrom)
+
+    summary = solver.summary()
+    if metrics is not None:
+        summary["metrics"] = metrics.to_dict()
+    _add_baseline(summary, baseline)
+    return best_chrom, best, conv, history, end_time - start_time, summary
+
+
+def _add_baseline(summary, baseline):
+    if baseline is not None:
+        summary["baseline_cost"] = baseline.cost
+        summary["lower_bound"] = baseline.lower_bound
+        summary["baseline_status"] = baseline.status
+
+
+def run_grid(
+    network,
+    tasks,
+    solver_kwargs,
+    workers=1,
+    island_kwargs=None,
+    collect_metrics=False,
+    checkpoint_kwargs=None,
+    baseline_kwargs=None,
+):
+    """
+    Runs (aggregation, modularity, seed) tasks and yields their results in task order.
+
+    With more than one worker tasks are dispatched to a process pool; the network is
+    sent to every worker once, at start-up, instead of with each task. Every run is
+    seeded only by its own task, so results do not depend on the number of workers.
+    """
+    tasks = [
+        (
+            agg,
+            m,
+            seed,
+            solver_kwargs,
+            island_kwargs,
+            collect_metrics,
+            checkpoint_kwargs,
+            baseline_kwargs,
+        )
+        for agg, m, seed in tasks
+    ]
+
+    if workers <= 1:
+        for task in tasks:
+            yield solve(network, *task)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(network,)
+    ) as pool:
+        yield from pool.map(_solve_task, tasks)
@@ -0,0 +1,456 @@
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from src.utils.loader import SNDlibLoader
+from src.utils.paths import PathOptions
+from src.runner import solve
+from src.incidence import PathIncidence
+from src import config
+
+MODES = {"agg": True, "deagg": False}
+PATH_OPTION_FIELDS = {f.name for f in dataclasses.fields(PathOptions)}
+
+# networks parsed by this worker process, keyed on (path, modification time, options)
+_networks = {}
+# progress queue and ids of cancelled jobs, set once per worker by _init_worker
+_progress = None
+_cancelled = None
+
+
+def _init_worker(progress, cancelled, preload):
+    global _progress, _cancelled
+    # Ctrl-C reaches the whole process group, shutting the pool down is up to the
+    # service - workers would only print KeyboardInterrupt tracebacks
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _progress = progress
+    _cancelled = cancelled
+    for file_path in preload:
+        _network(file_path, PathOptions())
+
+
+def _warm_up():
+    """No-op task, makes the pool start (and preload) every worker up front"""
+    return os.getpid()
+
+
+def _network(file_path, path_options):
+    """Network of a file, parsed once per worker process while the file is unchanged"""
+    file_path = os.path.abspath(file_path)
+    key = (file_path, os.path.getmtime(file_path), path_options)
+    if key not in _networks:
+        for stale in [k for k in _networks if k[0] == file_path]:
+            del _networks[stale]
+        _networks[key] = SNDlibLoader.load_compiled(
+            file_path, path_options=path_options
+        )
+    return _networks[key]
+
+
+def _run_job(job_id, request, progress_every):
+    """Runs a job in a pool worker, reporting progress and stopping once cancelled"""
+    network = _network(request["input_file"], PathOptions(**request["path_options"]))
+    best = float("inf")
+
+    def callback(solver, gen, scores):
+        nonlocal best
+        best = min(best, int(scores.min()))
+        if gen % progress_every == 0:
+            _progress.put((job_id, gen, best, solver.evaluations))
+        return job_id in _cancelled
+
+    best_chrom, best_cost, conv, history, run_time, summary = solve(
+        network,
+        MODES[request["mode"]],
+        request["modularity"],
+        request["seed"],
+        request["params"],
+        baseline_kwargs=request["baseline"],
+        callback=callback,
+    )
+    result = {
+        "best_cost": best_cost,
+        "convergence_gen": conv,
+        "history": history,
+        "time": run_time,
+        "summary": summary,
+    }
+    if request["chromosome"] and best_chrom is not None:
+        result["chromosome"] = PathIncidence(network).to_matrix(best_chrom).tolist()
+    return result
+
+
+def job_request(message):
+    """Validated job parameters of a submit message, missing ones set to defaults"""
+    request = {
+        "input_file": message.get("input_file", config.DATA_FILE),
+        "mode": message.get("mode", "agg"),
+        "modularity": float(message.get("modularity", config.DEFAULT_MODULARITY)),
+        "seed": message.get("seed"),
+        "params": dict(message.get("params") or {}),
+        "path_options": dict(message.get("path_options") or {}),
+        "baseline": message.get("baseline"),
+        "chromosome": bool(message.get("chromosome", False)),
+    }
+    if not os.path.isfile(request["input_file"]):
+        raise ValueError(f"No such network file: {request['input_file']}")
+    if request["mode"] not in MODES:
+        raise ValueError(f"Unknown mode: {request['mode']}")
+    unknown = set(request["path_options"]) - PATH_OPTION_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown path options: {sorted(unknown)}")
+    if request["seed"] is None:
+        # drawn here so the job can be reproduced from its queued event
+        request["seed"] = np.random.SeedSequence().entropy
+    request["seed"] = int(request["seed"])
+    return request
+
+
+@dataclass
+class Job:
+    id: int
+    request: dict
+    state: str = "queued"
+    # outboxes of the connections following the job
+    watchers: set = field(default_factory=set)
+    task: asyncio.Task = None
+    # last event of a job that ended (finished, cancelled or failed)
+    outcome: dict = None
+
+
+class OptimizationService:
+    """
+    Asyncio job queue running optimizations on a persistent process pool.
+
+    Clients talk JSON Lines (one object per line, see handle()). Workers keep
+    their imports and parsed networks between jobs, so a job only pays for the
+    run itself. At most `workers` jobs run at once, up to `max_queued` more wait
+    in the queue. Per-generation progress comes back from the run callback through
+    a queue, cancellation goes the other way: the callback stops the run once the
+    job id shows up in a shared set. Queued jobs are simply dropped.
+    """
+
+    def __init__(
+        self,
+        workers=config.DEFAULT_SERVICE_WORKERS,
+        max_queued=config.DEFAULT_SERVICE_MAX_QUEUED,
+        progress_every=config.DEFAULT_SERVICE_PROGRESS_EVERY,
+        keep_finished=config.DEFAULT_SERVICE_KEEP_FINISHED,
+        preload=(),
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.progress_every = max(1, progress_every)
+        self.keep_finished = keep_finished
+        self.preload = list(preload)
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._slots = None
+        self._pool = None
+        # outboxes and handler tasks of open client connections
+        self._clients = {}
+
+    async def start(self):
+        ctx = multiprocessing.get_context()
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._manager = ctx.Manager()
+        self._cancelled = self._manager.dict()
+        self._progress = ctx.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._progress, self._cancelled, self.preload),
+        )
+        await asyncio.gather(
+            *(
+                self._loop.run_in_executor(self._pool, _warm_up)
+                for _ in range(self.workers)
+            )
+        )
+        self._forwarder = threading.Thread(target=self._forward_progress, daemon=True)
+        self._forwarder.start()
+
+    async def close(self):
+        # dropping jobs may let finished ones out of self.jobs
+        for job in list(self.jobs.values()):
+            if job.state == "running":
+                # the task has to keep waiting for the worker, which stops after
+                # its current generation
+                self._cancelled[job.id] = True
+            elif job.state == "queued":
+                self._drop(job)
+        await asyncio.gather(
+            *(job.task for job in self.jobs.values() if job.task is not None),
+            return_exceptions=True,
+        )
+        # the last events are queued, hang up on the clients instead of having
+        # their handlers cancelled mid-read
+        for outbox in self._clients:
+            outbox.put_nowait(None)
+        await asyncio.gather(*self._clients.values(), return_exceptions=True)
+        self._pool.shutdown(wait=True)
+        self._progress.put(None)
+        self._forwarder.join()
+        self._manager.shutdown()
+
+    def _forward_progress(self):
+        """Thread moving worker progress reports onto the event loop"""
+        while (item := self._progress.get()) is not None:
+            self._loop.call_soon_threadsafe(self._report_progress, *item)
+
+    def _report_progress(self, job_id, gen, best_cost, evaluations):
+        job = self.jobs.get(job_id)
+        if job is not None and job.state == "running":
+            self._publish(
+                job,
+                {
+                    "event": "progress",
+                    "generation": gen,
+                    "best_cost": best_cost,
+                    "evaluations": evaluations,
+                },
+            )
+
+    def _publish(self, job, event):
+        event = dict(event, job=job.id)
+        for outbox in job.watchers:
+            outbox.put_nowait(event)
+        return event
+
+    def submit(self, request, outbox):
+        queued = sum(job.state == "queued" for job in self.jobs.values())
+        if queued >= self.max_queued:
+            raise ValueError(f"Queue is full ({queued} jobs waiting)")
+        job = Job(next(self._ids), request, watchers={outbox})
+        self.jobs[job.id] = job
+        self._publish(
+            job,
+            {"event": "queued", "seed": request["seed"], "position": queued + 1},
+        )
+        job.task = asyncio.create_task(self._execute(job))
+        return job
+
+    async def _execute(self, job):
+        try:
+            async with self._slots:
+                job.state = "running"
+                self._publish(job, {"event": "started"})
+                result = await self._loop.run_in_executor(
+                    self._pool, _run_job, job.id, job.request, self.progress_every
+                )
+        except asyncio.CancelledError:
+            if job.outcome is None:
+                self._end(job, "cancelled", {"event": "cancelled"})
+            return
+        except Exception as e:
+            self._end(
+                job, "failed", {"event": "failed", "error": f"{type(e).__name__}: {e}"}
+            )
+            return
+        finally:
+            self._cancelled.pop(job.id, None)
+
+        if result["summary"]["termination_reason"] == "callback":
+            self._end(job, "cancelled", dict(result, event="cancelled"))
+        else:
+            self._end(job, "finished", dict(result, event="finished"))
+
+    def _end(self, job, state, event):
+        job.state = state
+        job.outcome = self._publish(job, event)
+        job.watchers.clear()
+        ended = [j for j in self.jobs.values() if j.outcome is not None]
+        for old in ended[: max(0, len(ended) - self.keep_finished)]:
+            del self.jobs[old.id]
+
+    def _drop(self, job):
+        """Ends a queued job - its task may not have started, so it can't do it itself"""
+        job.task.cancel()
+        self._end(job, "cancelled", {"event": "cancelled"})
+
+    def cancel(self, job_id):
+        job = self._job(job_id)
+        if job.state == "queued":
+            self._drop(job)
+        elif job.state == "running":
+            self._cancelled[job.id] = True
+        else:
+            raise ValueError(f"Job {job.id} already {job.state}")
+        return {"event": "cancelling", "job": job.id}
+
+    def watch(self, job_id, outbox):
+        job = self._job(job_id)
+        if job.outcome is not None:
+            return job.outcome
+        job.watchers.add(outbox)
+        return {"event": "watching", "job": job.id, "state": job.state}
+
+    def status(self):
+        return {
+            "event": "status",
+            "jobs": [
+                {
+                    "job": job.id,
+                    "state": job.state,
+                    "input_file": job.request["input_file"],
+                    "mode": job.request["mode"],
+                    "modularity": job.request["modularity"],
+                }
+                for job in self.jobs.values()
+            ],
+        }
+
+    def _job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        return job
+
+    def dispatch(self, message, outbox):
+        """Reply to a single client message (None when events follow instead)"""
+        op = message.get("op")
+        if op == "submit":
+            self.submit(job_request(message), outbox)
+            return None
+        if op == "cancel":
+            return self.cancel(message.get("job"))
+        if op == "watch":
+            return self.watch(message.get("job"), outbox)
+        if op == "status":
+            return self.status()
+        raise ValueError(f"Unknown op: {op}")
+
+    async def handle(self, reader, writer):
+        """
+        Serves one client connection.
+
+        Messages: {"op": "submit", "input_file", "mode": "agg"|"deagg", "modularity",
+        "seed", "params": {EvoSolver arguments}, "path_options", "baseline",
+        "chromosome": bool}, {"op": "cancel"|"watch", "job": id}, {"op": "status"}.
+        Events of submitted and watched jobs (queued, started, progress, finished,
+        cancelled, failed) are streamed back as they happen. Jobs keep running
+        when their client disconnects.
+        """
+        outbox = asyncio.Queue()
+        sender = asyncio.create_task(_send(outbox, writer))
+        self._clients[outbox] = asyncio.current_task()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    reply = self.dispatch(json.loads(line), outbox)
+                except (ValueError, TypeError, AttributeError) as e:
+                    reply = {"event": "error", "error": str(e)}
+                if reply is not None:
+                    outbox.put_nowait(reply)
+        except ConnectionError:
+            pass
+        finally:
+            for job in self.jobs.values():
+                job.watchers.discard(outbox)
+            del self._clients[outbox]
+            outbox.put_nowait(None)
+            await sender
+
+
+async def _send(outbox, writer):
+    try:
+        while (event := await outbox.get()) is not None:
+            writer.write((json.dumps(event) + "\n").encode())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(args):
+    service = OptimizationService(
+        workers=args.workers,
+        max_queued=args.max_queued,
+        progress_every=args.progress_every,
+        preload=args.preload,
+    )
+    await service.start()
+    if args.socket:
+        server = await asyncio.start_unix_server(service.handle, path=args.socket)
+        address = args.socket
+    else:
+        server = await asyncio.start_server(service.handle, args.host, args.port)
+        address = f"{args.host}:{args.port}"
+    print(f"SERVING ON {address}, WORKERS: {args.workers}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Job queue service running network design optimizations",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--host", type=str, default=config.DEFAULT_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.DEFAULT_SERVICE_PORT)
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="Path of a Unix socket to listen on instead of TCP.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.DEFAULT_SERVICE_WORKERS,
+        help="Number of jobs running at once, each in its own worker process.",
+    )
+    parser.add_argument(
+        "--max_queued",
+        type=int,
+        default=config.DEFAULT_SERVICE_MAX_QUEUED,
+        help="Number of jobs waiting for a worker before submissions are refused.",
+    )
+    parser.add_argument(
+        "--progress_every",
+        type=int,
+        default=config.DEFAULT_SERVICE_PROGRESS_EVERY,
+        help="Generations between progress events of a running job.",
+    )
+    parser.add_argument(
+        "--preload",
+        nargs="*",
+        default=[config.DATA_FILE],
+        help="Network files parsed by every worker at start-up.",
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nService stopped")
+    finally:
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(project_root)
+
+from src.models import CompiledNetwork
+from src.utils.paths import (
+    PATH_WEIGHTS,
+    PathOptions,
+    admissible_paths,
+    short_detour_paths,
+)
+
+TOPOLOGIES = ["geometric", "waxman"]
+
+# side of the square nodes are placed in (SNDlib parser only accepts positive coordinates)
+AREA_SIZE = 100.0
+# node pairs compared at once while looking for links
+PAIR_CHUNK = 1 << 22
+
+
+def _node_pairs(xy):
+    """Yields (i, j, distance) blocks of all node pairs with i < j, in bounded chunks"""
+    n = len(xy)
+    rows = max(1, PAIR_CHUNK // max(n, 1))
+    for start in range(0, n, rows):
+        i, j = np.nonzero(
+            np.arange(start, min(start + rows, n))[:, None] < np.arange(n)[None, :]
+        )
+        i += start
+        yield i, j, np.hypot(*(xy[i] - xy[j]).T)
+
+
+def geometric_links(xy, degree, rng=None):
+    """Random geometric graph: nodes closer than a radius giving ~degree neighbours"""
+    radius = AREA_SIZE * np.sqrt(degree / (np.pi * max(len(xy), 1)))
+    links = [np.stack([i, j], axis=1)[d <= radius] for i, j, d in _node_pairs(xy)]
+    return np.concatenate(links) if links else np.empty((0, 2), dtype=np.int64)
+
+
+def waxman_links(xy, alpha, beta, rng):
+    """Waxman graph: nodes i, j linked with probability beta * exp(-d / (alpha * L))"""
+    span = np.hypot(*(xy.max(axis=0) - xy.min(axis=0))) if len(xy) else 1.0
+    links = []
+    for i, j, d in _node_pairs(xy):
+        keep = rng.random(len(d)) < beta * np.exp(-d / (alpha * max(span, 1e-9)))
+        links.append(np.stack([i, j], axis=1)[keep])
+    return np.concatenate(links) if links else np.empty((0, 2), dtype=np.int64)
+
+
+def connect_components(xy, links):
+    """Adds the shortest links joining every component to the biggest one"""
+    n = len(xy)
+    parent = np.arange(n)
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    for a, b in links.tolist():
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+    roots = np.array([find(a) for a in range(n)])
+
+    labels, sizes = np.unique(roots, return_counts=True)
+    if len(labels) <= 1:
+        return links
+
+    # grow the biggest component, always attaching the closest remaining one
+    joined = roots == labels[np.argmax(sizes)]
+    extra = []
+    while not joined.all():
+        inside = np.flatnonzero(joined)
+        outside = np.flatnonzero(~joined)
+        best = None
+        for start in range(0, len(outside), max(1, PAIR_CHUNK // len(inside))):
+            block = outside[start : start + max(1, PAIR_CHUNK // len(inside))]
+            d = np.hypot(*(xy[block][:, None, :] - xy[inside][None, :, :]).T).T
+            k = np.unravel_index(np.argmin(d), d.shape)
+            if best is None or d[k] < best[0]:
+                best = (d[k], block[k[0]], inside[k[1]])
+        _, node, other = best
+        extra.append((min(node, other), max(node, other)))
+        joined |= roots == roots[node]
+    return np.concatenate([links, np.array(extra, dtype=links.dtype)])
+
+
+def random_demands(num_nodes, num_demands, rng):
+    """Distinct random (source, target) pairs with source < target, sorted"""
+    max_demands = num_nodes * (num_nodes - 1) // 2
+    if num_demands > max_demands:
+        raise ValueError(
+            f"{num_nodes} nodes allow at most {max_demands} demands, got {num_demands}"
+        )
+
+    codes = np.empty(0, dtype=np.int64)
+    while len(codes) < num_demands:
+        drawn = rng.integers(0, num_nodes, size=(2 * (num_demands - len(codes)), 2))
+        drawn = drawn[drawn[:, 0] != drawn[:, 1]]
+        drawn.sort(axis=1)
+        new = np.unique(drawn[:, 0] * num_nodes + drawn[:, 1])
+        new = rng.permutation(np.setdiff1d(new, codes))
+        codes = np.concatenate([codes, new[: num_demands - len(codes)]])
+    codes.sort()
+    return np.stack([codes // num_nodes, codes % num_nodes], axis=1)
+
+
+def generate(
+    num_nodes,
+    num_demands,
+    k_paths=5,
+    topology="geometric",
+    degree=4.0,
+    alpha=0.15,
+    beta=0.4,
+    value_range=(50, 250),
+    seed=None,
+    path_options: PathOptions = None,
+    detour_paths=False,
+):
+    """
+    Random network with random demands and admissable paths generated the same way
+    SNDlibLoader generates missing ones (paths.admissible_paths), by default the
+    k_paths shortest ones by link length; path_options replaces these defaults.
+    detour_paths picks the much faster short_detour_paths heuristic instead.
+    Returns it in the compact CompiledNetwork form.
+    """
+    options = path_options or PathOptions(k=k_paths, weight="length")
+    if detour_paths and (options.max_hops or options.max_stretch or options.disjoint):
+        raise ValueError("Detour paths can't be bounded or disjoint")
+    rng = np.random.default_rng(seed)
+    xy = np.round(rng.random((num_nodes, 2)) * AREA_SIZE, 2)
+
+    if topology == "geometric":
+        links = geometric_links(xy, degree)
+    elif topology == "waxman":
+        links = waxman_links(xy, alpha, beta, rng)
+    else:
+        raise ValueError(f"Unknown topology: {topology}")
+    links = connect_components(xy, links.astype(np.int64))
+
+    pairs = random_demands(num_nodes, num_demands, rng)
+    values = rng.integers(
+        value_range[0], value_range[1], size=len(pairs), endpoint=True
+    )
+    if detour_paths:
+        weights = np.ones(len(links))
+        if options.weight == "length":
+            weights = np.hypot(*(xy[links[:, 0]] - xy[links[:, 1]]).T)
+        paths = short_detour_paths(num_nodes, links, weights, pairs, options.k)
+    else:
+        paths = admissible_paths(num_nodes, links, xy[links], pairs, options)
+    flat = [path for demand_paths in paths for path in demand_paths]
+
+    return CompiledNetwork(
+        node_ids=np.array([f"N{i}" for i in range(num_nodes)], dtype=str),
+        node_xy=xy,
+        link_ids=np.array([f"Link_{u}_{v}" for u, v in links.tolist()], dtype=str),
+        link_ends=links.astype(np.int32),
+        demand_ids=np.array([f"Demand_{s}_{t}" for s, t in pairs.tolist()], dtype=str),
+        demand_ends=pairs.astype(np.int32),
+        demand_values=values.astype(np.float64),
+        path_offsets=np.cumsum([0] + [len(p) for p in paths], dtype=np.int64),
+        path_link_offsets=np.cumsum([0] + [len(p) for p in flat], dtype=np.int64),
+        path_links=np.array([link for path in flat for link in path], dtype=np.int32),
+    )
+
+
+def write_sndlib(network: CompiledNetwork, file_path, name="synthetic"):
+    """Writes a network in the SNDlib native format read by SNDlibLoader"""
+    node_ids = network.node_ids.tolist()
+    link_ids = network.link_ids.tolist()
+    xy = network.node_xy
+    ends = network.link_ends
+    lengths = np.hypot(*(xy[ends[:, 0]] - xy[ends[:, 1]]).T).tolist()
+
+    lines = [
+        "?SNDlib native format; type: network; version: 1.0",
+        f"# network {name}",
+        "",
+        "# NODE SECTION",
+        "#",
+        "# <node_id> [(<longitude>, <latitude>)]",
+        "",
+        "NODES (",
+    ]
+    for node_id, (x, y) in zip(node_ids, xy.tolist()):
+        lines.append(f"  {node_id} ( {x:.2f} {y:.2f} )")
+    lines += [
+        ")",
+        "",
+        "# LINK SECTION",
+        "#",
+        "# <link_id> ( <source> <target> ) <pre_installed_capacity> <pre_installed_capacity_cost> <routing_cost> <setup_cost> ( {<module_capacity> <module_cost>}* )",
+        "",
+        "LINKS (",
+    ]
+    for link_id, (u, v), length in zip(link_ids, ends.tolist(), lengths):
+        lines.append(
+            f"  {link_id} ( {node_ids[u]} {node_ids[v]} ) 0.00 0.00 0.00 {length:.2f} "
+            f"( 155.00 {length:.2f} 622.00 {3 * length:.2f} )"
+        )
+    lines += [
+        ")",
+        "",
+        "# DEMAND SECTION",
+        "#",
+        "# <demand_id> ( <source> <target> ) <routing_unit> <demand_value> <max_path_length>",
+        "",
+        "DEMANDS (",
+    ]
+    demand_ids = network.demand_ids.tolist()
+    for demand_id, (s, t), value in zip(
+        demand_ids, network.demand_ends.tolist(), network.demand_values.tolist()
+    ):
+        lines.append(
+            f"  {demand_id} ( {node_ids[s]} {node_ids[t]} ) 1 {value:.2f} UNLIMITED"
+        )
+    lines += [
+        ")",
+        "",
+        "# ADMISSIBLE PATHS SECTION",
+        "#",
+        "# <demand_id> ( {<path_id> ( <link_id>+ )}+ )",
+        "",
+        "ADMISSIBLE_PATHS (",
+    ]
+    path_offsets = network.path_offsets.tolist()
+    link_offsets = network.path_link_offsets.tolist()
+    path_link_ids = np.array(link_ids, dtype=object)[network.path_links].tolist()
+    for d, demand_id in enumerate(demand_ids):
+        lines.append(f"  {demand_id} (")
+        for rank, p in enumerate(range(path_offsets[d], path_offsets[d + 1])):
+            links = " ".join(path_link_ids[link_offsets[p] : link_offsets[p + 1]])
+            lines.append(f"    P_{rank} ( {links} )")
+        lines.append("  )")
+    lines.append(")")
+
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generates a random network in SNDlib native format."
+    )
+    parser.add_argument("--nodes", type=int, default=100)
+    parser.add_argument("--demands", type=int, default=1000)
+    parser.add_argument(
+        "--k_paths",
+        type=int,
+        default=5,
+        help="Number of admissable paths (k shortest ones) per demand.",
+    )
+    parser.add_argument(
+        "--path_weight",
+        type=str,
+        default="length",
+        choices=PATH_WEIGHTS,
+        help="Length measure of paths: number of links or euclidean length.",
+    )
+    parser.add_argument(
+        "--max_hops",
+        type=int,
+        default=None,
+        help="Maximum number of links of alternative paths.",
+    )
+    parser.add_argument(
+        "--max_stretch",
+        type=float,
+        default=None,
+        help="Maximum length of alternative paths relative to the shortest one.",
+    )
+    parser.add_argument(
+        "--disjoint_paths", action="store_true", help="Link-disjoint paths only."
+    )
+    parser.add_argument(
+        "--detour_paths",
+        action="store_true",
+        help="Shortest path and detours (fast heuristic) instead of the k shortest paths.",
+    )
+    parser.add_argument("--topology", type=str, default="geometric", choices=TOPOLOGIES)
+    parser.add_argument(
+        "--degree", type=float, default=4.0, help="Mean degree (geometric)."
+    )
+    parser.add_argument("--alpha", type=float, default=0.15, help="Waxman alpha.")
+    parser.add_argument("--beta", type=float, default=0.4, help="Waxman beta.")
+    parser.add_argument("--min_value", type=int, default=50)
+    parser.add_argument("--max_value", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(
+        project_root, "data", f"synthetic_{args.nodes}_{args.demands}.txt"
+    )
+
+    start = time.perf_counter()
+    try:
+        network = generate(
+            args.nodes,
+            args.demands,
+            k_paths=args.k_paths,
+            topology=args.topology,
+            degree=args.degree,
+            alpha=args.alpha,
+            beta=args.beta,
+            value_range=(args.min_value, args.max_value),
+            seed=args.seed,
+            path_options=PathOptions(
+                k=args.k_paths,
+                weight=args.path_weight,
+                max_hops=args.max_hops,
+                max_stretch=args.max_stretch,
+                disjoint=args.disjoint_paths,
+            ),
+            detour_paths=args.detour_paths,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    write_sndlib(network, output, name=os.path.splitext(os.path.basename(output))[0])
+
+    print(
+        f"Generated {network.num_nodes} nodes, {network.num_links} links, "
+        f"{network.num_demands} demands, {network.num_paths.sum()} paths "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    print(f"Saved to {output}")
@@ -1,10 +1,124 @@
+import dataclasses
+import hashlib
+import json
+import os
 import re
-from src.models import Network, Node, Link, Demand
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.models import CompiledNetwork, Network, Node, Link, Demand
+from src.utils.paths import PathOptions, admissible_paths
+
+CACHE_DIR_NAME = ".sndlib_cache"
+# bump when the layout of cached arrays changes
+CACHE_VERSION = 2
 
 
 class SNDlibLoader:
     @staticmethod
-    def load(file_path: str) -> Network:
+    def load(
+        file_path: str, use_cache: bool = True, path_options: PathOptions = None
+    ) -> Network:
+        """
+        Loads a network in SNDlib native format.
+
+        Parsed networks are cached as memory-mapped binary arrays next to the input
+        file, keyed on the hash of its content, so repeated runs skip the parsing.
+        Demands without ADMISSIBLE_PATHS get generated ones (see generate_paths).
+        The Node/Link/Demand dataclasses are always built, even on a cache hit -
+        callers that only need the arrays (EvoSolver and friends) should use
+        load_compiled instead.
+        """
+        if use_cache:
+            try:
+                return SNDlibLoader.load_compiled(
+                    file_path, path_options=path_options
+                ).to_network()
+            except KeyError:
+                # paths or demands referring to unknown links/nodes can't be compiled
+                pass
+        return SNDlibLoader.generate_paths(SNDlibLoader.parse(file_path), path_options)
+
+    @staticmethod
+    def load_compiled(
+        file_path: str, use_cache: bool = True, path_options: PathOptions = None
+    ) -> CompiledNetwork:
+        """Same as load, but returns the compact array form without building dataclasses"""
+        if not use_cache:
+            network = SNDlibLoader.parse(file_path)
+            return SNDlibLoader.generate_paths(network, path_options).compile()
+
+        cache_path = SNDlibLoader.cache_path(file_path, path_options)
+        if os.path.isdir(cache_path):
+            try:
+                return CompiledNetwork.load(cache_path)
+            except (OSError, ValueError, KeyError):
+                # partial or corrupt - out of the way, or the new one can't replace it
+                shutil.rmtree(cache_path, ignore_errors=True)
+
+        network = SNDlibLoader.parse(file_path)
+        compiled = SNDlibLoader.generate_paths(network, path_options).compile()
+        SNDlibLoader._save_cache(compiled, cache_path)
+        return compiled
+
+    @staticmethod
+    def generate_paths(network: Network, path_options: PathOptions = None) -> Network:
+        """
+        Fills admissable paths of demands the file gives none for, in place.
+
+        These are the exact k shortest paths of every demand (Yen's algorithm, see
+        paths.PathSearch), sharing one shortest path tree per distinct target.
+        """
+        missing = [d for d in network.demands.values() if not d.admissable_paths]
+        if not missing:
+            return network
+
+        options = path_options or PathOptions()
+        node_index = {node_id: i for i, node_id in enumerate(network.nodes)}
+        link_ids = list(network.links)
+        xy = np.array([(n.x, n.y) for n in network.nodes.values()]).reshape(-1, 2)
+        link_ends = np.array(
+            [
+                (node_index[link.source], node_index[link.target])
+                for link in network.links.values()
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        pairs = [(node_index[d.source], node_index[d.target]) for d in missing]
+
+        paths = admissible_paths(
+            len(node_index), link_ends, xy[link_ends], pairs, options
+        )
+        for demand, demand_paths in zip(missing, paths):
+            demand.admissable_paths = [
+                [link_ids[link] for link in path] for path in demand_paths
+            ]
+        return network
+
+    @staticmethod
+    def cache_path(file_path: str, path_options: PathOptions = None) -> str:
+        """Cache directory of a given input file (depends on its content and path options)"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        options = json.dumps(
+            dataclasses.asdict(path_options or PathOptions()), sort_keys=True
+        )
+        options_digest = hashlib.blake2b(options.encode(), digest_size=4).hexdigest()
+        name = (
+            f"{os.path.basename(file_path)}-v{CACHE_VERSION}-{options_digest}"
+            f"-{digest.hexdigest()}"
+        )
+        cache_dir = os.path.join(
+            os.path.dirname(os.path.abspath(file_path)), CACHE_DIR_NAME
+        )
+        return os.path.join(cache_dir, name)
+
+    @staticmethod
+    def parse(file_path: str) -> Network:
         """
         Function to parse data from .txt in SNDlib native format
         """
@@ -86,3 +200,37 @@ class SNDlibLoader:
                                 ].admissable_paths.append(links_list)
 
         return network
+
+    @staticmethod
+    def _save_cache(compiled: CompiledNetwork, cache_path: str):
+        """Stores the compiled network as .npy arrays, written atomically"""
+        parent = os.path.dirname(cache_path)
+        tmp_dir = None
+        try:
+            os.makedirs(parent, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(dir=parent)
+            compiled.save(tmp_dir)
+            os.replace(tmp_dir, cache_path)
+        except OSError:
+            # unwritable directory or a concurrent writer - just skip caching
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        # caches of older layouts, or of the same options but older content of the
+        # file, are useless; other path options of the same file are kept
+        name = os.path.basename(cache_path)
+        file_name, _, options_digest, _ = name.rsplit("-", 3)
+        # whole names only, "net.txt-v2.txt" caches must survive "net.txt" ones;
+        # version 1 caches had no options digest
+        pattern = re.compile(
+            rf"^{re.escape(file_name)}-v(\d+)(?:-([0-9a-f]{{8}}))?-[0-9a-f]{{32}}$"
+        )
+        for entry in os.listdir(parent):
+            stale = os.path.join(parent, entry)
+            match = pattern.match(entry)
+            if stale == cache_path or match is None:
+                continue
+            version, options = match.groups()
+            if int(version) != CACHE_VERSION or options == options_digest:
+                shutil.rmtree(stale, ignore_errors=True)
@@ -0,0 +1,437 @@
+import heapq
+from dataclasses import dataclass
+
+import numpy as np
+
+from src import config
+
+# detours inspected per demand, demands with few simple detours get less than k paths
+CANDIDATE_FACTOR = 8
+# bounded / disjoint paths are picked from this many times k shortest ones
+CANDIDATE_POOL = 4
+PATH_WEIGHTS = ["hops", "length"]
+
+
+@dataclass(frozen=True)
+class PathOptions:
+    """How admissable paths are generated for demands an SNDlib file gives none for"""
+
+    k: int = config.DEFAULT_K_PATHS
+    # "hops" counts links, "length" sums euclidean lengths of links
+    weight: str = config.DEFAULT_PATH_WEIGHT
+    # bounds of alternative paths, the shortest path of a demand is always kept
+    max_hops: int = config.DEFAULT_MAX_HOPS
+    max_stretch: float = config.DEFAULT_MAX_STRETCH
+    # greedily keep only paths sharing no link with the ones kept before
+    disjoint: bool = config.DEFAULT_DISJOINT_PATHS
+
+    def __post_init__(self):
+        if self.weight not in PATH_WEIGHTS:
+            raise ValueError(f"Unknown path weight: {self.weight}")
+
+
+def shortest_path_trees(num_nodes, link_ends, link_weights, roots):
+    """
+    Shortest path tree of an undirected graph from every root.
+
+    Returns distances (len(roots) x num_nodes) and the link through which every
+    node is reached (-1 for the root and unreachable nodes).
+    Uses scipy's compiled Dijkstra when it is installed, plain heapq otherwise.
+    """
+    roots = np.asarray(roots, dtype=np.int64)
+    link_ends = np.asarray(link_ends, dtype=np.int64).reshape(-1, 2)
+    link_weights = np.asarray(link_weights, dtype=np.float64)
+
+    try:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import dijkstra
+    except ImportError:
+        return _heapq_trees(num_nodes, link_ends, link_weights, roots)
+
+    # keep the cheapest of parallel links, scipy would merge them anyway
+    order = np.lexsort((link_weights, link_ends.max(axis=1), link_ends.min(axis=1)))
+    lo = link_ends.min(axis=1)[order]
+    hi = link_ends.max(axis=1)[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+    kept = order[first]
+
+    u, v = link_ends[kept, 0], link_ends[kept, 1]
+    # zero weights would vanish from a sparse matrix
+    weights = np.maximum(link_weights[kept], 1e-12)
+    graph = coo_matrix((weights, (u, v)), shape=(num_nodes, num_nodes)).tocsr()
+    dist, pred = dijkstra(
+        graph, directed=False, indices=roots, return_predecessors=True
+    )
+
+    # translate predecessor nodes into links through sorted (node, node) keys
+    keys = np.concatenate([u * num_nodes + v, v * num_nodes + u])
+    order = np.argsort(keys)
+    keys = keys[order]
+    key_links = np.concatenate([kept, kept])[order]
+
+    pred_link = np.full(pred.shape, -1, dtype=np.int64)
+    rows, nodes = np.nonzero(pred >= 0)
+    wanted = pred[rows, nodes].astype(np.int64) * num_nodes + nodes
+    pred_link[rows, nodes] = key_links[np.searchsorted(keys, wanted)]
+    return dist, pred_link
+
+
+def _heapq_trees(num_nodes, link_ends, link_weights, roots):
+    adjacency = [[] for _ in range(num_nodes)]
+    for link, ((a, b), w) in enumerate(zip(link_ends.tolist(), link_weights.tolist())):
+        adjacency[a].append((b, w, link))
+        adjacency[b].append((a, w, link))
+
+    dist = np.full((len(roots), num_nodes), np.inf)
+    pred_link = np.full((len(roots), num_nodes), -1, dtype=np.int64)
+    for row, root in enumerate(roots.tolist()):
+        best = dist[row]
+        via = pred_link[row]
+        best[root] = 0.0
+        heap = [(0.0, root)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > best[node]:
+                continue
+            for other, w, link in adjacency[node]:
+                if d + w < best[other]:
+                    best[other] = d + w
+                    via[other] = link
+                    heapq.heappush(heap, (d + w, other))
+    return dist, pred_link
+
+
+def _tree_path(tree, root, node):
+    """Links from root to node in a shortest path tree, with the visited nodes"""
+    pred_link, pred_node = tree[:2]
+    links = []
+    nodes = [node]
+    while node != root:
+        links.append(pred_link[node])
+        node = pred_node[node]
+        nodes.append(node)
+    links.reverse()
+    nodes.reverse()
+    return links, nodes
+
+
+def short_detour_paths(num_nodes, link_ends, link_weights, pairs, k):
+    """
+    Up to k short loopless paths (lists of link indices) for every (source, target) pair.
+
+    A heuristic, not the exact k shortest paths: one shortest path tree is built per
+    distinct endpoint and shared by all demands using it. Candidates are the shortest
+    path and "detours": shortest path to one end of a link, the link itself and the
+    shortest path from its other end - all of them scored at once with NumPy.
+    Paths deviating from both trees are never found, so a demand can get other
+    paths than the k shortest ones, or fewer than k even if more exist.
+    """
+    link_ends = np.asarray(link_ends, dtype=np.int64).reshape(-1, 2)
+    link_weights = np.asarray(link_weights, dtype=np.float64)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+
+    roots, inverse = np.unique(pairs, return_inverse=True)
+    inverse = inverse.reshape(pairs.shape)
+    dist, pred_link = shortest_path_trees(num_nodes, link_ends, link_weights, roots)
+
+    trees = {}
+
+    def tree(row):
+        # plain lists, walking them is much faster than indexing NumPy scalars
+        if row not in trees:
+            links = pred_link[row]
+            other = link_ends[np.maximum(links, 0)]
+            nodes = np.where(
+                other[:, 0] == np.arange(num_nodes), other[:, 1], other[:, 0]
+            )
+            trees[row] = (links.tolist(), nodes.tolist())
+        return trees[row]
+
+    # every link in both orientations: (from, to, link)
+    tails = np.concatenate([link_ends[:, 0], link_ends[:, 1]])
+    heads = np.concatenate([link_ends[:, 1], link_ends[:, 0]])
+    arc_links = np.concatenate([np.arange(len(link_ends))] * 2)
+    arc_weights = link_weights[arc_links]
+
+    results = []
+    for (s, t), (row_s, row_t) in zip(pairs.tolist(), inverse.tolist()):
+        found = []
+        if s == t or not np.isfinite(dist[row_s, t]):
+            results.append(found)
+            continue
+
+        tree_s, tree_t = tree(row_s), tree(row_t)
+        shortest, _ = _tree_path(tree_s, s, t)
+        found.append(shortest)
+        seen = {tuple(shortest)}
+
+        # arcs of the source tree just extend it, they would repeat other candidates
+        scores = dist[row_s, tails] + arc_weights + dist[row_t, heads]
+        scores[pred_link[row_s, heads] == arc_links] = np.inf
+        limit = min(int(np.isfinite(scores).sum()), CANDIDATE_FACTOR * k)
+        if limit < 1 or k < 2:
+            results.append(found[:k])
+            continue
+        candidates = np.argpartition(scores, limit - 1)[:limit]
+        candidates = candidates[np.lexsort((candidates, scores[candidates]))]
+
+        for u, v, link in zip(
+            tails[candidates].tolist(),
+            heads[candidates].tolist(),
+            arc_links[candidates].tolist(),
+        ):
+            first, first_nodes = _tree_path(tree_s, s, u)
+            second, second_nodes = _tree_path(tree_t, t, v)
+            path = first + [link] + second[::-1]
+            nodes = first_nodes + second_nodes[::-1]
+            key = tuple(path)
+            if len(set(nodes)) != len(nodes) or key in seen:
+                continue
+            seen.add(key)
+            found.append(path)
+            if len(found) == k:
+                break
+        results.append(found)
+    return results
+
+
+def _clean_tail(tree, node, target, blocked_nodes, blocked_links, known):
+    """
+    Whether the tree path from node to target avoids every blocked node and link.
+
+    `known` caches the answer for nodes walked before, in the same search.
+    """
+    pred_link, pred_node = tree[:2]
+    walked = []
+    clean = True
+    while node != target:
+        if node in known:
+            clean = known[node]
+            break
+        walked.append(node)
+        if pred_link[node] in blocked_links or pred_node[node] in blocked_nodes:
+            clean = False
+            break
+        node = pred_node[node]
+    for node in walked:
+        known[node] = clean
+    return clean
+
+
+def _spur_search(
+    adjacency, source, target, blocked_nodes, blocked_links, tree, budget=np.inf
+):
+    """
+    Shortest path from source to target avoiding blocked nodes and links, or None.
+
+    A* guided by the shortest path tree of the target: its distances never
+    overestimate the ones with links removed, and are exact for every node whose
+    tree path is untouched - the search ends at the first such node it settles.
+    Paths longer than budget are not looked for.
+    """
+    to_target = tree[2]
+    best = {source: 0.0}
+    via = {}
+    known = {}
+    # ties go to the node furthest from the source, closest to the target
+    heap = [(to_target[source], 0.0, source)]
+    while heap:
+        f, d, node = heapq.heappop(heap)
+        if f > budget:
+            return None
+        d = -d
+        if d > best[node]:
+            continue
+        if _clean_tail(tree, node, target, blocked_nodes, blocked_links, known):
+            links, nodes = [], [node]
+            while node != source:
+                node, link = via[node]
+                links.append(link)
+                nodes.append(node)
+            links.reverse()
+            nodes.reverse()
+            tail_links, tail_nodes = _tree_path(tree, target, nodes[-1])
+            return links + tail_links[::-1], nodes + tail_nodes[-2::-1]
+        for other, w, link in adjacency[node]:
+            if other in blocked_nodes or link in blocked_links:
+                continue
+            nd = d + w
+            if nd < best.get(other, np.inf) and to_target[other] < np.inf:
+                best[other] = nd
+                via[other] = (node, link)
+                heapq.heappush(heap, (nd + to_target[other], -nd, other))
+    return None
+
+
+class PathSearch:
+    """
+    Shortest loopless paths between nodes of one undirected graph (Yen's algorithm).
+
+    One shortest path tree is built per distinct target and shared by all pairs
+    ending there. It gives the first path of a pair and guides every spur search
+    (A*) towards the target. Lawler's refinement restricts the spur nodes of a path
+    to the ones after the point where it left its parent path.
+    """
+
+    def __init__(self, num_nodes, link_ends, link_weights, targets):
+        link_ends = np.asarray(link_ends, dtype=np.int64).reshape(-1, 2)
+        self.num_nodes = num_nodes
+        self.weights = np.asarray(link_weights, dtype=np.float64).tolist()
+        roots = np.unique(np.asarray(targets, dtype=np.int64))
+        self._rows = {root: row for row, root in enumerate(roots.tolist())}
+        self._dist, self._pred_link = shortest_path_trees(
+            num_nodes, link_ends, self.weights, roots
+        )
+        self._link_ends = link_ends
+        self.adjacency = [[] for _ in range(num_nodes)]
+        for link, (u, v) in enumerate(link_ends.tolist()):
+            self.adjacency[u].append((v, self.weights[link], link))
+            self.adjacency[v].append((u, self.weights[link], link))
+        self._trees = {}
+
+    def tree(self, target):
+        """Predecessor links, predecessor nodes and distances of the tree of a target"""
+        # plain lists, walking them is much faster than indexing NumPy scalars
+        if target not in self._trees:
+            row = self._rows[target]
+            links = self._pred_link[row]
+            other = self._link_ends[np.maximum(links, 0)]
+            nodes = np.where(
+                other[:, 0] == np.arange(self.num_nodes), other[:, 1], other[:, 0]
+            )
+            self._trees[target] = (
+                links.tolist(),
+                nodes.tolist(),
+                self._dist[row].tolist(),
+            )
+        return self._trees[target]
+
+    def distance(self, source, target):
+        return self.tree(target)[2][source]
+
+    def paths(self, source, target, limit=None, excluded=frozenset(), max_cost=np.inf):
+        """
+        Loopless paths (lists of link indices) from source to target by increasing length.
+
+        Paths are found lazily, at most `limit` of them (knowing it prunes the search),
+        none using an excluded link or longer than max_cost.
+        """
+        tree = self.tree(target)
+        distance = tree[2][source]
+        if source == target or not np.isfinite(distance) or distance > max_cost:
+            return
+        first = _spur_search(
+            self.adjacency, source, target, set(), excluded, tree, max_cost
+        )
+        if first is None:
+            return
+        yield first[0]
+
+        weights = self.weights
+        to_target = tree[2]
+        found = [first]
+        seen = {tuple(first[0])}
+        candidates = []
+        deviation = 0
+        while limit is None or len(found) < limit:
+            links, nodes = found[-1]
+            needed = np.inf if limit is None else limit - len(found)
+            root_cost = sum(weights[link] for link in links[:deviation])
+            for i in range(deviation, len(links)):
+                if i > deviation:
+                    root_cost += weights[links[i - 1]]
+                # spurs that can't beat the candidates known already are not searched
+                bound = max_cost
+                if len(candidates) >= needed:
+                    best = heapq.nsmallest(needed, candidates)[-1][0]
+                    bound = min(bound, best + 1e-9 * max(1.0, best))
+                if root_cost + to_target[nodes[i]] > bound:
+                    continue
+                root = links[:i]
+                # the next link of every found path sharing this root is off limits
+                blocked_links = {
+                    other[i]
+                    for other, _ in found
+                    if len(other) > i and other[:i] == root
+                }
+                spur = _spur_search(
+                    self.adjacency,
+                    nodes[i],
+                    target,
+                    set(nodes[:i]),
+                    blocked_links.union(excluded),
+                    tree,
+                    bound - root_cost,
+                )
+                if spur is None:
+                    continue
+                path = root + spur[0]
+                key = tuple(path)
+                if key in seen:
+                    continue
+                seen.add(key)
+                cost = sum(weights[link] for link in path)
+                heapq.heappush(
+                    candidates, (cost, len(path), key, nodes[:i] + spur[1], i)
+                )
+            if not candidates:
+                return
+            _, _, key, path_nodes, deviation = heapq.heappop(candidates)
+            found.append((list(key), path_nodes))
+            yield found[-1][0]
+
+
+def k_shortest_paths(num_nodes, link_ends, link_weights, pairs, k):
+    """Exact k shortest loopless paths of every (source, target) pair, fewer if there are none"""
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    search = PathSearch(num_nodes, link_ends, link_weights, pairs[:, 1])
+    return [list(search.paths(s, t, k)) for s, t in pairs.tolist()]
+
+
+def admissible_paths(num_nodes, link_ends, link_xy, pairs, options: PathOptions):
+    """
+    Paths (lists of link indices) of every (source, target) pair, following options.
+
+    `link_xy` are (num_links x 2 x 2) coordinates of link ends, used by the "length"
+    weight. Without bounds these are the k shortest paths. Otherwise paths are taken
+    by increasing length, skipping ones over max_hops, from at most k * CANDIDATE_POOL
+    shortest paths within max_stretch; disjoint paths are the shortest ones avoiding
+    all links of the paths kept before.
+    """
+    link_ends = np.asarray(link_ends, dtype=np.int64).reshape(-1, 2)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    if options.weight == "length":
+        link_xy = np.asarray(link_xy, dtype=np.float64).reshape(-1, 2, 2)
+        weights = np.hypot(*(link_xy[:, 0] - link_xy[:, 1]).T)
+    else:
+        weights = np.ones(len(link_ends))
+
+    filtered = options.max_hops or options.max_stretch or options.disjoint
+    if not filtered:
+        return k_shortest_paths(num_nodes, link_ends, weights, pairs, options.k)
+
+    search = PathSearch(num_nodes, link_ends, weights, pairs[:, 1])
+    pool = options.k * CANDIDATE_POOL
+    results = []
+    for s, t in pairs.tolist():
+        max_cost = np.inf
+        if options.max_stretch:
+            max_cost = options.max_stretch * search.distance(s, t)
+            max_cost += 1e-9 * max(1.0, max_cost)
+        kept = []
+        used = set()
+        paths = search.paths(s, t, pool, max_cost=max_cost)
+        while len(kept) < options.k:
+            path = next(paths, None)
+            if path is None:
+                break
+            # the shortest path of a demand is always kept
+            if kept and options.max_hops and len(path) > options.max_hops:
+                continue
+            kept.append(path)
+            if options.disjoint:
+                used.update(path)
+                paths = search.paths(s, t, pool, frozenset(used), max_cost)
+        results.append(kept)
+    return results
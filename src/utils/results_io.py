@@ -0,0 +1,71 @@
+import json
+import os
+
+import numpy as np
+
+
+def chromosome_dir(results_path):
+    """Directory with .npy chromosomes referenced by a JSON Lines results file"""
+    return os.path.splitext(results_path)[0] + "_chromosomes"
+
+
+class ResultsWriter:
+    """
+    Streams results to disk, one JSON line per finished (mode, modularity) cell.
+
+    Chromosomes are not inlined: each is saved as a .npy array next to the results
+    file and the row only keeps its path (relative to the results file), so neither
+    memory nor the JSON grows with chromosome size x configurations.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.chromosome_dir = chromosome_dir(file_path)
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        self._fh = open(file_path, "w")
+
+    def write(self, row, chromosome=None, name=None):
+        row = dict(row)
+        if chromosome is not None:
+            os.makedirs(self.chromosome_dir, exist_ok=True)
+            array_path = os.path.join(self.chromosome_dir, f"{name}.npy")
+            np.save(array_path, np.asarray(chromosome))
+            row["best_chromosome"] = os.path.relpath(
+                array_path, os.path.dirname(os.path.abspath(self.file_path))
+            )
+        self._fh.write(json.dumps(row) + "\n")
+        # a crash loses at most the cell that was running
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_results(file_path):
+    """
+    Yields result rows one by one.
+
+    Reads JSON Lines lazily; old single-document .json results are still accepted.
+    """
+    with open(file_path, "r") as fh:
+        if file_path.endswith(".json"):
+            yield from json.load(fh)
+            return
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_chromosome(row, results_path, mmap_mode="r"):
+    """Best chromosome of a row, memory-mapped when stored as a .npy file"""
+    chromosome = row.get("best_chromosome")
+    if isinstance(chromosome, str):
+        base_dir = os.path.dirname(os.path.abspath(results_path))
+        return np.load(os.path.join(base_dir, chromosome), mmap_mode=mmap_mode)
+    return np.asarray(chromosome if chromosome is not None else [])
@@ -1,19 +1,26 @@
-import json
+import sys
 import csv
+import itertools
 import os
 import argparse
 
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.utils.results_io import iter_results
+
 
 def json_to_csv(input_path, output_path):
     if not os.path.exists(input_path):
         print(f"Error: File {input_path} not found.")
         return
 
-    with open(input_path, "r") as f:
-        data = json.load(f)
-
-    if not data:
-        print("Error: JSON file is empty.")
+    # rows are streamed from the results file, never all held in memory
+    data = iter_results(input_path)
+    first = next(data, None)
+    if first is None:
+        print("Error: results file is empty.")
         return
 
     columns = [
@@ -35,7 +42,7 @@ def json_to_csv(input_path, output_path):
             headers = {col: col.replace("_", " ").upper() for col in columns}
             writer.writerow(headers)
 
-            for row in data:
+            for row in itertools.chain([first], data):
                 clean_row = {col: row.get(col) for col in columns}
 
                 for key, val in clean_row.items():
@@ -52,7 +59,7 @@ def json_to_csv(input_path, output_path):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input_file", type=str, default="results/results.json")
+    parser.add_argument("--input_file", type=str, default="results/results.jsonl")
     parser.add_argument("--output_file", type=str, default="results/results_excel.csv")
     args = parser.parse_args()
 
@@ -6,7 +6,6 @@ import matplotlib.image as mpimg
 import networkx as nx
 import argparse
 import numpy as np
-import random
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
@@ -14,76 +13,64 @@ sys.path.append(project_root)
 
 from src.utils.loader import SNDlibLoader
 from src.ea import EvoSolver
+from src.incidence import PathIncidence
+from src.models import Network
 from src import config
 
 
 def calculate_link_loads(network, chromosome, is_aggregation):
-    link_loads = {link.id: 0.0 for link in network.links.values()}
-    demand_ids = sorted(network.demands.keys(), key=lambda x: int(x.split("_")[1]))
-
-    for i, demand_id in enumerate(demand_ids):
-        demand = network.demands[demand_id]
-        paths = demand.admissable_paths
-
-        if len(chromosome.shape) > 1:
-            weights = chromosome[i]
-
-            if is_aggregation:
-                # Aggregation: Winner takes all
-                chosen_idx = np.argmax(weights)
-                if chosen_idx < len(paths):
-                    for link_id in paths[chosen_idx]:
-                        link_loads[link_id] += demand.value
-            else:
-                # Deaggregation: Proportional split
-                total_w = np.sum(weights)
-                if total_w > 0:
-                    weights = weights / total_w
-
-                for p_idx, path in enumerate(paths):
-                    flow = demand.value * weights[p_idx]
-                    if flow > 0:
-                        for link_id in path:
-                            link_loads[link_id] += flow
-        else:
-            path_idx = int(chromosome[i])
-            if path_idx < len(paths):
-                selected_path = paths[path_idx]
-                for link_id in selected_path:
-                    link_loads[link_id] += demand.value
+    incidence = PathIncidence(network)
+    chromosome = np.asarray(chromosome)
+
+    if chromosome.ndim > 1:
+        # padded (num_demands x max_paths) layout of result files
+        flows = incidence.path_flows(incidence.from_matrix(chromosome), is_aggregation)
+    elif len(chromosome) == incidence.num_genes and chromosome.dtype.kind == "f":
+        flows = incidence.path_flows(chromosome, is_aggregation)
+    else:
+        # one admissable path index per demand
+        one_hot = np.eye(incidence.max_paths)[chromosome.astype(int)]
+        flows = incidence.path_flows(incidence.from_matrix(one_hot), True)
+
+    link_loads = dict(zip(incidence.link_ids, incidence.link_loads(flows).tolist()))
 
     total_flow = sum(link_loads.values())
     print(f"TOTAL FLOW: {total_flow}")
     return link_loads
 
 
-def visualize_network(file_path, chromosome, modularity, is_aggregation):
-    network = SNDlibLoader.load(file_path)
+def visualize_network(file_path, chromosome, modularity, is_aggregation, network=None):
+    if network is None:
+        network = SNDlibLoader.load_compiled(file_path)
+    elif isinstance(network, Network):
+        network = network.compile()
     link_loads = calculate_link_loads(network, chromosome, is_aggregation)
 
     G = nx.Graph()
 
-    xs = []
-    ys = []
+    node_ids = network.node_ids.tolist()
+    xs = network.node_xy[:, 0].tolist()
+    ys = network.node_xy[:, 1].tolist()
     pos = {}
-    for node in network.nodes.values():
-        G.add_node(node.id)
-        pos[node.id] = (node.x, node.y)
-        xs.append(node.x)
-        ys.append(node.y)
+    for node_id, x, y in zip(node_ids, xs, ys):
+        G.add_node(node_id)
+        pos[node_id] = (x, y)
 
     edges = []
     weights = []
     edge_labels = {}
 
-    for link in network.links.values():
-        load = link_loads[link.id]
+    for link_id, (src, trg) in zip(
+        network.link_ids.tolist(), network.link_ends.tolist()
+    ):
+        load = link_loads[link_id]
+        source, target = node_ids[src], node_ids[trg]
 
         if load > 0:
-            G.add_edge(link.source, link.target)
-            edges.append((link.source, link.target))
+            G.add_edge(source, target)
+            edges.append((source, target))
             weights.append(load)
-            edge_labels[(link.source, link.target)] = str(int(load))
+            edge_labels[(source, target)] = str(int(load))
 
     plt.figure(figsize=(12, 12))
 
@@ -161,10 +148,6 @@ if __name__ == "__main__":
     parser.add_argument("--seed", type=int, default=None)
     args = parser.parse_args()
 
-    if args.seed is not None:
-        random.seed(args.seed)
-        np.random.seed(args.seed)
-
     is_aggregation = not args.deagg
     mode_name = "Deaggregation" if args.deagg else "Aggregation"
 
@@ -172,8 +155,7 @@ if __name__ == "__main__":
         f"RUNNING MAP GENERATOR...\nMODULARITY: {args.modularity}, MODE: {mode_name}\n"
     )
 
-    loader = SNDlibLoader()
-    network = loader.load(args.file)
+    network = SNDlibLoader.load_compiled(args.file)
 
     solver = EvoSolver(
         network,
@@ -183,9 +165,12 @@ if __name__ == "__main__":
         generations=args.gens,
         mutation_rate=args.mutation_rate,
         alpha=args.alpha,
+        rng=args.seed,
     )
 
     best_chromosome, best_cost, _, _ = solver.run()
 
     print(f"Best Cost found: {best_cost}")
-    visualize_network(args.file, best_chromosome, args.modularity, is_aggregation)
+    visualize_network(
+        args.file, best_chromosome, args.modularity, is_aggregation, network=network
+    )
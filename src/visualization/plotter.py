@@ -1,16 +1,27 @@
-import json
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 import argparse
 
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from src.utils.results_io import iter_results
+
+# fields needed by the plots, everything else (run summaries...) is skipped on load
+PLOT_FIELDS = ("mode", "modularity", "best_cost", "avg_time", "histories")
+
 
 def load_results(filename):
     if not os.path.exists(filename):
         print(f"File {filename} not found.")
         return []
-    with open(filename, "r") as f:
-        return json.load(f)
+    return [
+        {key: row[key] for key in PLOT_FIELDS if key in row}
+        for row in iter_results(filename)
+    ]
 
 
 def ensure_plot_dir(directory="results/plots"):
@@ -180,7 +191,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "--file",
         type=str,
-        default="results/results.json",
+        default="results/results.jsonl",
     )
     args = parser.parse_args()
 
@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import subprocess
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.loader import SNDlibLoader
+from src.utils.generator import generate
+from src.ea import EvoSolver
+
+# name: (nodes, demands, admissable paths per demand)
+SYNTHETIC_SIZES = {
+    "small": (50, 500, 5),
+    "medium": (200, 2000, 5),
+    "large": (400, 5000, 7),
+}
+
+# metrics where a higher value is better, all the others are times
+HIGHER_IS_BETTER = {"evals_per_sec"}
+
+
+def timed(func, repeats):
+    """Median wall time of func() in milliseconds"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def peak_alloc_kb(func):
+    """Peak memory (KB) allocated while running func(), numpy buffers included"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_peak_rss_kb(network, aggregation, pop, generations):
+    """Peak RSS (KB) of a full run in a fresh process, not shared with other cases"""
+    # spawned, so the process starts without the pages of the benchmark itself
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(
+            _full_run_rss, network, aggregation, pop, generations
+        ).result()
+
+
+def _full_run_rss(network, aggregation, pop, generations):
+    EvoSolver(
+        network,
+        aggregation=aggregation,
+        pop_size=pop,
+        generations=generations,
+        rng=0,
+    ).run()
+    # ru_maxrss would inherit the high-water mark of the parent across fork/exec,
+    # VmHWM belongs to this process' own address space
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench_case(network, aggregation, pop, generations, repeats):
+    """Timings of every EvoSolver hot path for one instance / mode / pop size"""
+    solver = EvoSolver(
+        network, aggregation=aggregation, pop_size=pop, cache_size=0, rng=0
+    )
+    solver.initialize_population()
+    population = solver.population
+    individual = population[0]
+    scores = solver.evaluate_population(population)
+    sigma = solver.base_sigma
+    block = solver._offspring
+    count = pop - 1
+
+    results = {
+        "get_link_loads": {
+            "ms": timed(lambda: solver.get_load_vector(individual), repeats)
+        },
+        "calculate_cost": {
+            "ms": timed(lambda: solver.calculate_cost(individual), repeats)
+        },
+        "evaluate_population": {
+            "ms": timed(lambda: solver.evaluate_population(population), repeats)
+        },
+        "selection": {
+            "ms": timed(lambda: solver.selection(scores, 2 * count), repeats)
+        },
+        "crossover": {
+            "ms": timed(
+                lambda: solver.crossover(population, population[::-1], out=block),
+                repeats,
+            )
+        },
+        "mutation": {"ms": timed(lambda: solver.mutation(block, sigma), repeats)},
+        "reproduce": {
+            "ms": timed(lambda: solver.reproduce(scores, block[:count], sigma), repeats)
+        },
+    }
+    results["calculate_cost"]["evals_per_sec"] = 1000 / results["calculate_cost"]["ms"]
+    results["evaluate_population"]["evals_per_sec"] = (
+        pop * 1000 / results["evaluate_population"]["ms"]
+    )
+
+    def full_run():
+        runner = EvoSolver(
+            network,
+            aggregation=aggregation,
+            pop_size=pop,
+            generations=generations,
+            rng=0,
+        )
+        start = time.perf_counter()
+        runner.run()
+        return runner, time.perf_counter() - start
+
+    runner, elapsed = full_run()
+    results["generation"] = {
+        "ms": elapsed * 1000 / runner.generations_run,
+        "evals_per_sec": runner.evaluations / elapsed,
+        "peak_alloc_kb": peak_alloc_kb(full_run),
+        "peak_rss_kb": run_peak_rss_kb(network, aggregation, pop, generations),
+    }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Prints metrics that got worse than the baseline by more than threshold"""
+    old = {r["case"]: r for r in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        if row["case"] not in old:
+            continue
+        for metric, value in row["metrics"].items():
+            before = old[row["case"]]["metrics"].get(metric)
+            if not before or metric.endswith("_kb") and before < 1024:
+                continue
+            change = (value - before) / before
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append((row["case"], metric, before, value, change))
+
+    print("=" * 100)
+    if not regressions:
+        print(f"No regressions above {threshold:.0%} against the baseline")
+    for case, metric, before, value, change in regressions:
+        print(
+            f"REGRESSION {case:<45} {metric:<15} {before:>12.3f} -> {value:>12.3f} ({change:+.0%})"
+        )
+    return regressions
+
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--file", type=str, default=os.path.join(base_dir, "data", "polska.txt")
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="*",
+        default=["small", "medium"],
+        choices=list(SYNTHETIC_SIZES),
+        help="Synthetic instances benchmarked next to the input file.",
+    )
+    parser.add_argument("--pops", nargs="+", type=int, default=[100, 300, 1000])
+    parser.add_argument("--modes", nargs="+", default=["agg", "deagg"])
+    parser.add_argument("--gens", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=os.path.join(base_dir, "results", "benchmark.json"),
+    )
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results.")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    instances = {os.path.basename(args.file): SNDlibLoader.load_compiled(args.file)}
+    for size in args.sizes:
+        print(f"Generating synthetic instance '{size}'...")
+        num_nodes, num_demands, k_paths = SYNTHETIC_SIZES[size]
+        instances[size] = generate(num_nodes, num_demands, k_paths, seed=0)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "results": [],
+    }
+
+    print("=" * 100)
+    print(f"{'Case':<45} | {'ms':>10} | {'evals/sec':>12} | {'peak KB':>10}")
+    for name, network in instances.items():
+        print("-" * 100)
+        for mode in args.modes:
+            for pop in args.pops:
+                results = bench_case(
+                    network, mode == "agg", pop, args.gens, args.repeats
+                )
+                for op, metrics in results.items():
+                    case = f"{name}/{mode}/pop{pop}/{op}"
+                    report["results"].append({"case": case, "metrics": metrics})
+                    print(
+                        f"{case:<45} | {metrics['ms']:>10.3f} | "
+                        f"{metrics.get('evals_per_sec', float('nan')):>12.1f} | "
+                        f"{metrics.get('peak_alloc_kb', float('nan')):>10.0f}"
+                    )
+
+    report["meta"]["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=4)
+    print("=" * 100)
+    print(f"Peak RSS: {report['meta']['peak_rss_kb']} KB")
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
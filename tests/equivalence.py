@@ -0,0 +1,253 @@
+import os
+import sys
+import signal
+import argparse
+import tempfile
+import multiprocessing
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.loader import SNDlibLoader
+from src.ea import EvoSolver
+from src.encodings import create_solver
+from src.runner import run_grid, spawn_seeds
+
+MODES = {"agg": True, "deagg": False}
+# small runs, long enough for many offspring generations and a few delta refreshes
+RUN_KWARGS = dict(modularity=10, pop_size=60, generations=60, stagnation_limit=None)
+CHECKPOINT_EVERY = 5
+# generation the interrupted run is killed at, a few generations past its checkpoint
+KILL_AT = 23
+# solver settings whose state the checkpoint has to carry over
+RESUME_CASES = {
+    "fixed": {},
+    "one_fifth + restarts": {"adaptation": "one_fifth", "restart_after": 8},
+    "self_adaptive": {"adaptation": "self_adaptive"},
+    "incremental": {"incremental": True},
+}
+
+
+def outcome(solver, result):
+    """Everything a run should reproduce exactly: best cost, histories, last population"""
+    best_chrom, best_cost, conv, history = result
+    return (
+        solver.to_weights(best_chrom).tobytes(),
+        solver.population.tobytes(),
+        best_cost,
+        conv,
+        history,
+        solver.sigma_history,
+    )
+
+
+def check(name, expected, actual):
+    ok = expected == actual
+    print(f"{name:<64} {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+def test_incremental(network, seeds=(0, 1, 2)):
+    """Delta evaluation gives every individual the cost of a full evaluation"""
+    ok = True
+    for mode, aggregation in MODES.items():
+        for seed in seeds:
+            mismatches = []
+
+            def full_costs(solver, gen, scores):
+                full = solver.batch_cost(solver.population)
+                if not np.array_equal(scores, full):
+                    mismatches.append(gen)
+                return False
+
+            solver = EvoSolver(
+                network,
+                aggregation=aggregation,
+                incremental=True,
+                rng=seed,
+                **RUN_KWARGS,
+            )
+            incremental = outcome(solver, solver.run(callback=full_costs))
+            ok &= check(
+                f"{mode} seed {seed}: delta costs of every generation", [], mismatches
+            )
+
+            solver = EvoSolver(network, aggregation=aggregation, rng=seed, **RUN_KWARGS)
+            full = outcome(solver, solver.run())
+            ok &= check(
+                f"{mode} seed {seed}: incremental run == full run", full, incremental
+            )
+    return ok
+
+
+def _killed_run(network, aggregation, seed, kwargs, checkpoint_path):
+    """Checkpointed run that gets SIGKILLed mid-way, like a crashed job"""
+
+    def kill(solver, gen, scores):
+        if gen == KILL_AT:
+            os.kill(os.getpid(), signal.SIGKILL)
+        return False
+
+    EvoSolver(network, aggregation=aggregation, rng=seed, **RUN_KWARGS, **kwargs).run(
+        callback=kill,
+        checkpoint_path=checkpoint_path,
+        checkpoint_every=CHECKPOINT_EVERY,
+    )
+
+
+def test_resume(network, seed=0):
+    """A run killed and resumed from its last checkpoint ends exactly like an uninterrupted one"""
+    ok = True
+    ctx = multiprocessing.get_context()
+    for mode, aggregation in MODES.items():
+        for case, kwargs in RESUME_CASES.items():
+            solver = EvoSolver(
+                network, aggregation=aggregation, rng=seed, **RUN_KWARGS, **kwargs
+            )
+            expected = outcome(solver, solver.run())
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                checkpoint_path = os.path.join(tmp_dir, "run.npz")
+                process = ctx.Process(
+                    target=_killed_run,
+                    args=(network, aggregation, seed, kwargs, checkpoint_path),
+                )
+                process.start()
+                process.join()
+                if process.exitcode != -signal.SIGKILL:
+                    raise RuntimeError(f"Run was not killed: {process.exitcode}")
+
+                # a different seed - everything has to come from the checkpoint
+                solver = EvoSolver(
+                    network,
+                    aggregation=aggregation,
+                    rng=seed + 1,
+                    **RUN_KWARGS,
+                    **kwargs,
+                )
+                resumed = outcome(
+                    solver,
+                    solver.run(
+                        checkpoint_path=checkpoint_path,
+                        checkpoint_every=CHECKPOINT_EVERY,
+                        resume=True,
+                    ),
+                )
+            ok &= check(
+                f"{mode} {case}: killed + resumed == uninterrupted", expected, resumed
+            )
+
+        # a finished run continued with more generations
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint_path = os.path.join(tmp_dir, "run.npz")
+            short = dict(RUN_KWARGS, generations=KILL_AT)
+            EvoSolver(network, aggregation=aggregation, rng=seed, **short).run(
+                checkpoint_path=checkpoint_path, checkpoint_every=CHECKPOINT_EVERY
+            )
+            solver = EvoSolver(
+                network, aggregation=aggregation, rng=seed + 1, **RUN_KWARGS
+            )
+            extended = outcome(
+                solver,
+                solver.run(
+                    checkpoint_path=checkpoint_path,
+                    checkpoint_every=CHECKPOINT_EVERY,
+                    resume=True,
+                ),
+            )
+        solver = EvoSolver(network, aggregation=aggregation, rng=seed, **RUN_KWARGS)
+        expected = outcome(solver, solver.run())
+        ok &= check(f"{mode} finished + extended == uninterrupted", expected, extended)
+    return ok
+
+
+def test_workers(network, base_seed=0, repeats=2, modularities=(1, 10)):
+    """Results do not depend on the number of grid (--workers) or evaluation processes"""
+    ok = True
+    cells = [(agg, m) for agg in MODES.values() for m in modularities]
+    seeds = spawn_seeds(base_seed, len(cells), repeats)
+    tasks = [
+        (agg, m, seed)
+        for (agg, m), cell_seeds in zip(cells, seeds)
+        for seed in cell_seeds
+    ]
+    solver_kwargs = dict(RUN_KWARGS)
+    del solver_kwargs["modularity"]
+    grids = {}
+    for workers in (1, 2):
+        grids[workers] = [
+            # everything but the wall time
+            (best_chrom.tobytes(), best, conv, history, summary)
+            for best_chrom, best, conv, history, _, summary in run_grid(
+                network, tasks, solver_kwargs, workers=workers
+            )
+        ]
+    ok &= check(
+        f"grid of {len(tasks)} runs: --workers 2 == --workers 1", grids[1], grids[2]
+    )
+
+    for mode, aggregation in MODES.items():
+        for encoding in ["weights", "index"] if aggregation else ["weights"]:
+            runs = {}
+            for eval_workers in (1, 2, 3):
+                solver = create_solver(
+                    network,
+                    encoding=encoding,
+                    aggregation=aggregation,
+                    rng=base_seed,
+                    eval_workers=eval_workers,
+                    **RUN_KWARGS,
+                )
+                runs[eval_workers] = outcome(solver, solver.run())
+            for eval_workers in (2, 3):
+                ok &= check(
+                    f"{mode} {encoding}: --eval_workers {eval_workers} == --eval_workers 1",
+                    runs[1],
+                    runs[eval_workers],
+                )
+    return ok
+
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(
+        description="Checks that optimizations do not change results."
+    )
+    parser.add_argument("--test_incremental", action="store_true")
+    parser.add_argument("--test_resume", action="store_true")
+    parser.add_argument("--test_workers", action="store_true")
+    parser.add_argument("--all", action="store_true")
+    parser.add_argument(
+        "--file", type=str, default=os.path.join(base_dir, "data", "polska.txt")
+    )
+    args = parser.parse_args()
+
+    print(f"Loading data from {args.file}")
+    network = SNDlibLoader.load_compiled(args.file)
+
+    ok = True
+    if args.test_incremental or args.all:
+        print("=" * 100)
+        print("< Incremental vs full evaluation >")
+        ok &= test_incremental(network)
+
+    if args.test_resume or args.all:
+        print("=" * 100)
+        print("< Checkpoint, kill and resume vs uninterrupted run >")
+        ok &= test_resume(network)
+
+    if args.test_workers or args.all:
+        print("=" * 100)
+        print("< Grid and evaluation workers vs a single process >")
+        ok &= test_workers(network)
+
+    print("=" * 100)
+    if not ok:
+        print("Results differ")
+        sys.exit(1)
+    print("All results identical")
+
+
+if __name__ == "__main__":
+    main()
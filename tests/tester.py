@@ -2,11 +2,16 @@ import os
 import argparse
 import numpy as np
 import sys
+import threading
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.utils.loader import SNDlibLoader
 from src.ea import EvoSolver
+from src.islands import run_islands
+
+# an island run taking longer than this is considered deadlocked
+ISLANDS_TIMEOUT = 120
 
 
 def main():
@@ -14,6 +19,7 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--test_solver", action="store_true")
     parser.add_argument("--test_loading", action="store_true")
+    parser.add_argument("--test_islands", action="store_true")
     parser.add_argument("--all", action="store_true")
     parser.add_argument(
         "--file", type=str, default=os.path.join(base_dir, "data", "polska.txt")
@@ -22,9 +28,10 @@ def main():
 
     try:
         print(f"Loading data from {args.file}")
-        network = SNDlibLoader.load(args.file)
+        compiled = SNDlibLoader.load_compiled(args.file)
 
         if args.test_loading or args.all:
+            network = compiled.to_network()
             print("=" * 100)
             print(f"> Node count: {len(network.nodes)}")
             print("-" * 50)
@@ -48,13 +55,12 @@ def main():
         if args.test_solver or args.all:
             print("\n" + "=" * 100)
             print("< Testing evolutionary solver functions >\n")
-            solver = EvoSolver(network, modularity=1.0, aggregation=True)
+            solver = EvoSolver(compiled, modularity=1.0, aggregation=True)
 
-            d_count = len(solver.demand_ids)
-            k_max = max(len(d.admissable_paths) for d in network.demands.values())
+            num_genes = solver.incidence.num_genes
 
-            ind1 = np.random.rand(d_count, k_max)
-            ind2 = np.random.rand(d_count, k_max)
+            ind1 = np.random.rand(num_genes)
+            ind2 = np.random.rand(num_genes)
 
             print("-" * 50)
             loads = solver.get_link_loads(ind1)
@@ -78,11 +84,49 @@ def main():
             )
             print("=" * 100)
 
+        if args.test_islands or args.all:
+            print("\n" + "=" * 100)
+            print("< Testing island runs stopping at different generations >\n")
+            test_islands(compiled)
+            print("=" * 100)
+
         print("finito")
 
     except Exception as e:
         print(f"ERROR! : {e} :(")
 
 
+def test_islands(network, trials=10):
+    """Islands with different stagnation limits finish early, one after another"""
+    for seed in range(trials):
+        outcome = []
+        thread = threading.Thread(
+            target=lambda: outcome.append(
+                run_islands(
+                    network,
+                    seed=seed,
+                    num_islands=4,
+                    topology="full",
+                    migration_interval=1,
+                    migration_size=3,
+                    island_params=[
+                        {"stagnation_limit": 1 + (j * 3) % 7} for j in range(4)
+                    ],
+                    pop_size=20,
+                    generations=40,
+                    modularity=10,
+                )
+            ),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(ISLANDS_TIMEOUT)
+        if not outcome:
+            raise RuntimeError(f"Island run with seed {seed} did not finish")
+        (_, best_cost, _, _), summary = outcome[0]
+        generations = [island["generations_run"] for island in summary["islands"]]
+        print(f"Seed {seed}: cost {best_cost}, generations per island {generations}")
+
+
 if __name__ == "__main__":
     main()